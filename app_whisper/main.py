@@ -20,6 +20,9 @@ start_time = datetime.now(timezone.utc)
 FULLY_QUALIFIED_NAMESPACE = os.getenv("SERVICE_BUS_NAMESPACE")
 IN_QUEUE_NAME = os.getenv("APP_SB_IN_QUEUE", "whisper_iq")
 OUT_QUEUE_NAME = os.getenv("APP_SB_OUT_QUEUE", "whisper_oq")
+# Files received together are processed concurrently, so one file's download and
+# preprocessing overlap with another's Whisper calls
+MESSAGE_BATCH_SIZE = int(os.getenv("APP_SB_BATCH_SIZE", "2"))
 
 # Initialize service bus handler with DefaultAzureCredential
 logger.info(f"Using DefaultAzureCredential for Service Bus authentication with namespace: {FULLY_QUALIFIED_NAMESPACE}")
@@ -27,7 +30,9 @@ service_bus_handler = AsyncServiceBusHandler(
     processor_function=process_data,
     in_queue_name=IN_QUEUE_NAME,
     out_queue_name=OUT_QUEUE_NAME,
-    fully_qualified_namespace=FULLY_QUALIFIED_NAMESPACE
+    fully_qualified_namespace=FULLY_QUALIFIED_NAMESPACE,
+    message_batch_size=MESSAGE_BATCH_SIZE,
+    concurrent_processing=True
 )
 
 
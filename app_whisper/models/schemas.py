@@ -17,7 +17,7 @@ class SpeakerSegment(BaseModel):
 
 class ChannelInfo(BaseModel):
     """Information about audio channel processing."""
-    channel_id: str = Field(..., description="Channel identifier (left/right)")
+    channel_id: str = Field(..., description="Channel identifier (left/right, or mono)")
     speaker_id: str = Field(..., description="Associated speaker ID")
     file_path: str = Field(..., description="Path to processed channel file")
     duration: float = Field(..., description="Duration in seconds")
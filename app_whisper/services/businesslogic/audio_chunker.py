@@ -4,10 +4,12 @@ Handles size-based chunking while maintaining timestamp alignment between channe
 """
 import math
 import os
+import shutil
 import tempfile
 import soundfile as sf
 from typing import List, Dict
 from app_whisper.models.schemas import ChannelInfo, AudioChunk
+from app_whisper.services.temp_storage import get_temp_parent
 from common_new.logger import get_logger
 
 logger = get_logger("businesslogic")
@@ -23,7 +25,7 @@ class AudioChunker:
             max_chunk_size_mb: The maximum size for each chunk in megabytes.
         """
         self.max_chunk_size_mb = max_chunk_size_mb
-        self.temp_dir = tempfile.mkdtemp(prefix="whisper_chunks_")
+        self.temp_dir = tempfile.mkdtemp(prefix="whisper_chunks_", dir=get_temp_parent())
         logger.info(f"Initialized AudioChunker with temp directory: {self.temp_dir}")
         logger.info(f"Max chunk size set to: {self.max_chunk_size_mb} MB")
 
@@ -76,7 +78,7 @@ class AudioChunker:
             logger.info(f"Chunking channel for {info.speaker_id} from file: {info.file_path}")
             
             try:
-                audio_data, sample_rate = sf.read(info.file_path)
+                audio_data, sample_rate = sf.read(info.file_path, dtype='int16')
             except Exception as e:
                 logger.error(f"Failed to read audio file {info.file_path}: {e}")
                 raise
@@ -97,8 +99,8 @@ class AudioChunker:
                 chunk_filepath = os.path.join(self.temp_dir, chunk_filename)
 
                 try:
-                    sf.write(chunk_filepath, chunk_audio_data, sample_rate, format='FLAC', subtype='PCM_16')
-                    logger.info(f"Saved chunk {i+1} for {info.speaker_id} to {chunk_filepath}")
+                    sf.write(chunk_filepath, chunk_audio_data, sample_rate, format='FLAC', subtype='PCM_16', compression_level=0.0)
+                    logger.debug("Saved chunk %d for %s to %s", i + 1, info.speaker_id, chunk_filepath)
                 except Exception as e:
                     logger.error(f"Failed to write chunk file {chunk_filepath}: {e}")
                     raise
@@ -117,13 +119,8 @@ class AudioChunker:
     def cleanup(self):
         """Clean up the temporary directory used for chunks."""
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up temporary chunk directory: {self.temp_dir}")
         except Exception as e:
-            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
-
-    def __del__(self):
-        """Destructor to ensure cleanup."""
-        self.cleanup()
\ No newline at end of file
+            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
\ No newline at end of file
@@ -2,7 +2,8 @@
 Speaker Diarizer for channel-based speaker identification.
 Converts Whisper transcription results into speaker-labeled segments.
 """
-from typing import List
+from operator import itemgetter
+from typing import List, Tuple
 from app_whisper.models.schemas import SpeakerSegment, TranscribedChunk
 from common_new.logger import get_logger
 
@@ -38,8 +39,12 @@ class SpeakerDiarizer:
         logger.info(f"Diarization complete. Generated {len(merged_segments)} final speaker segments.")
         return merged_segments
 
-    def _get_all_segments(self, transcribed_chunks: List[TranscribedChunk]) -> List[SpeakerSegment]:
-        """Extracts and flattens all speaker segments from transcribed chunks, then sorts them."""
+    def _get_all_segments(self, transcribed_chunks: List[TranscribedChunk]) -> List[Tuple[float, float, str, str]]:
+        """
+        Extracts and flattens all segments from transcribed chunks, then sorts them.
+        Segments are kept as (start_time, end_time, speaker_id, text) tuples so only
+        the merged output is built as SpeakerSegment models.
+        """
         all_segments = []
         for t_chunk in transcribed_chunks:
             if t_chunk.error or not t_chunk.transcription_result:
@@ -49,38 +54,49 @@ class SpeakerDiarizer:
             speaker_id = t_chunk.chunk.speaker_id
 
             for segment_data in t_chunk.transcription_result.segments:
-                all_segments.append(SpeakerSegment(
-                    start_time=segment_data.start + chunk_start_time,
-                    end_time=segment_data.end + chunk_start_time,
-                    speaker_id=speaker_id,
-                    text=segment_data.text.strip()
+                all_segments.append((
+                    segment_data.start + chunk_start_time,
+                    segment_data.end + chunk_start_time,
+                    speaker_id,
+                    segment_data.text.strip()
                 ))
         
         # Sort the final list of all segments by their absolute start time
-        all_segments.sort(key=lambda s: s.start_time)
+        all_segments.sort(key=itemgetter(0))
         return all_segments
 
-    def _merge_consecutive_segments(self, segments: List[SpeakerSegment]) -> List[SpeakerSegment]:
+    def _merge_consecutive_segments(self, segments: List[Tuple[float, float, str, str]]) -> List[SpeakerSegment]:
         """Merges consecutive segments from the same speaker."""
         if not segments:
             return []
             
         merged = []
         # Initialize with the first segment
-        current_segment = segments[0]
+        current_start, current_end, current_speaker, first_text = segments[0]
+        current_texts = [first_text]
 
-        for i in range(1, len(segments)):
-            next_segment = segments[i]
+        for next_start, next_end, next_speaker, next_text in segments[1:]:
             # Check if the next segment is from the same speaker
-            if next_segment.speaker_id == current_segment.speaker_id:
+            if next_speaker == current_speaker:
                 # Merge the text and update the end time
-                current_segment.text += " " + next_segment.text
-                current_segment.end_time = next_segment.end_time
+                current_texts.append(next_text)
+                current_end = next_end
             else:
                 # Speaker has changed, so finalize the current segment and start a new one
-                merged.append(current_segment)
-                current_segment = next_segment
+                merged.append(SpeakerSegment(
+                    start_time=current_start,
+                    end_time=current_end,
+                    speaker_id=current_speaker,
+                    text=" ".join(current_texts)
+                ))
+                current_start, current_end, current_speaker = next_start, next_end, next_speaker
+                current_texts = [next_text]
         
         # Append the very last segment after the loop finishes
-        merged.append(current_segment)
-        return merged
\ No newline at end of file
+        merged.append(SpeakerSegment(
+            start_time=current_start,
+            end_time=current_end,
+            speaker_id=current_speaker,
+            text=" ".join(current_texts)
+        ))
+        return merged
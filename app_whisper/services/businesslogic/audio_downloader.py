@@ -2,14 +2,24 @@
 Audio File Downloader for Azure Blob Storage.
 Downloads audio files from blob storage using the filename as blob name.
 """
+import io
 import os
+import shutil
 import tempfile
+import soundfile as sf
 from typing import Tuple, Optional
+from app_whisper.services.temp_storage import get_temp_parent
 from common_new.blob_storage import AsyncBlobStorageDownloader
 from common_new.logger import get_logger
 
 logger = get_logger("businesslogic")
 
+# Bytes fetched from the start of a blob to read its audio header
+PROBE_BYTES = 65536
+
+# Bytes per sample of the uncompressed WAV subtypes whose duration follows from the blob size
+_WAV_SAMPLE_BYTES = {'PCM_U8': 1, 'PCM_S8': 1, 'ULAW': 1, 'ALAW': 1, 'PCM_16': 2, 'PCM_24': 3, 'PCM_32': 4, 'FLOAT': 4, 'DOUBLE': 8}
+
 class AudioFileDownloader:
     """Downloads audio files from Azure Blob Storage."""
     
@@ -31,7 +41,7 @@ class AudioFileDownloader:
         )
         
         # Create temp directory for downloads
-        self.temp_dir = tempfile.mkdtemp(prefix="whisper_downloads_")
+        self.temp_dir = tempfile.mkdtemp(prefix="whisper_downloads_", dir=get_temp_parent())
         logger.info(f"Initialized AudioFileDownloader with container: {self.container_name}")
         logger.info(f"Using temp directory: {self.temp_dir}")
     
@@ -87,6 +97,42 @@ class AudioFileDownloader:
             logger.error(error_msg)
             return False, "", error_msg
     
+    async def probe_duration(self, filename: str) -> Optional[float]:
+        """
+        Estimate the audio duration from the first bytes of the blob, without downloading it.
+        
+        Only WAV (uncompressed) and FLAC headers are trusted; for any other format, or if
+        the header cannot be read, None is returned and the duration is checked after download.
+        
+        Args:
+            filename: The filename/blob name to probe
+            
+        Returns:
+            Optional[float]: Duration in seconds, or None if it cannot be told from the header
+        """
+        # Other formats cannot be sized from their header, so skip the request entirely
+        if os.path.splitext(filename)[1].lower() not in ('.wav', '.flac'):
+            return None
+        
+        head = await self.blob_service.read_blob_head(filename, PROBE_BYTES)
+        if head is None:
+            return None
+        data, blob_size = head
+        
+        try:
+            info = sf.info(io.BytesIO(data))
+        except Exception as e:
+            logger.debug("Could not read audio header of %s: %s", filename, e)
+            return None
+        
+        if info.format == 'FLAC' and info.frames > 0:
+            return info.frames / info.samplerate
+        if info.format in ('WAV', 'WAVEX') and info.subtype in _WAV_SAMPLE_BYTES:
+            # A truncated header understates the frame count, so size the data from the whole
+            # blob instead (counting the header bytes too, which only overestimates)
+            return blob_size / (info.samplerate * info.channels * _WAV_SAMPLE_BYTES[info.subtype])
+        return None
+    
     def _is_valid_audio_file(self, filename: str) -> bool:
         """
         Check if filename has a valid audio extension.
@@ -112,8 +158,6 @@ class AudioFileDownloader:
             Tuple[bool, dict]: (is_stereo, audio_info)
         """
         try:
-            import soundfile as sf
-            
             # Get audio file info
             info = sf.info(file_path)
             
@@ -141,13 +185,8 @@ class AudioFileDownloader:
     def cleanup(self):
         """Clean up temporary downloaded files."""
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up temporary directory: {self.temp_dir}")
         except Exception as e:
-            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
-    
-    def __del__(self):
-        """Cleanup on object destruction."""
-        self.cleanup()
\ No newline at end of file
+            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
\ No newline at end of file
@@ -3,23 +3,129 @@ Audio Preprocessor for channel-based speaker diarization.
 Handles stereo channel splitting, resampling, and FLAC format conversion.
 """
 import os
+import json
+import time
+import asyncio
+import shutil
 import tempfile
 import numpy as np
-from typing import Tuple, List, Dict, Any, Optional
+import soundfile as sf
+import soxr
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, List, Dict, Any, Optional, Set
 from app_whisper.models.schemas import ChannelInfo
+from app_whisper.services.temp_storage import get_temp_parent
 from common_new.logger import get_logger
 
 logger = get_logger("businesslogic")
 
+# Numba is listed in requirements; if it is missing, silence bounds are found with
+# the vectorized NumPy path instead of the fused JIT kernel
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def _frame_energy(left_channel, right_channel, base, frame_length):
+        """Sum of squares of one frame across both channels."""
+        total = 0.0
+        for j in range(frame_length):
+            left = float(left_channel[base + j])
+            right = float(right_channel[base + j])
+            total += left * left + right * right
+        return total
+
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def _find_non_silent_frames(left_channel, right_channel, frame_length, energy_threshold):
+        """
+        Return the first and last frame whose combined two-channel energy exceeds
+        energy_threshold, or (-1, -1) if every frame is silent.
+        
+        Compares per-frame sums of squares against the threshold scaled by the
+        number of samples, so no mean/sqrt is computed and no energy array is built.
+        Scans forward to the first loud frame and backward to the last one, so only
+        the silent head and tail (plus one frame each) are ever read.
+        """
+        num_frames = left_channel.size // frame_length
+        limit = energy_threshold * 2 * frame_length
+        first = -1
+        for i in range(num_frames):
+            if _frame_energy(left_channel, right_channel, i * frame_length, frame_length) > limit:
+                first = i
+                break
+        if first < 0:
+            return -1, -1
+        last = first
+        for i in range(num_frames - 1, first, -1):
+            if _frame_energy(left_channel, right_channel, i * frame_length, frame_length) > limit:
+                last = i
+                break
+        return first, last
+
+    # Compile for the int16 channels _load_audio_file produces now, at import, so the
+    # first request does not pay for it (later processes load it from the cache)
+    _find_non_silent_frames(np.zeros(1, dtype=np.int16), np.zeros(1, dtype=np.int16), 1, 0.0)
+
+# Shared thread pool for per-channel resample/encode work; soxr and libsndfile
+# release the GIL, so channels (and concurrent requests) run in parallel
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_PID: Optional[int] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Return this process's channel thread pool, creating it on first use.
+    
+    A forked child inherits the parent's executor without its threads, so the
+    pool is created again whenever the process id has changed.
+    """
+    global _EXECUTOR, _EXECUTOR_PID
+    if _EXECUTOR is None or _EXECUTOR_PID != os.getpid():
+        _EXECUTOR = ThreadPoolExecutor(max_workers=max(2, os.cpu_count() or 1))
+        _EXECUTOR_PID = os.getpid()
+    return _EXECUTOR
+
+# Samples per block when resampling and encoding a channel
+_STREAM_BLOCK_SIZE = 1 << 18
+
 class AudioPreprocessor:
     """Preprocesses stereo audio for channel-based speaker diarization."""
     
+    # Shared parent directories already created in this process
+    _temp_roots: Set[str] = set()
+    
     def __init__(self):
-        """Initialize the preprocessor."""
+        """
+        Initialize the preprocessor.
+        
+        Processed files go to a new per-request subdirectory of the shared temp
+        root, which is removed again on cleanup.
+        """
         # Create temp directory for processed files
-        self.temp_dir = tempfile.mkdtemp(prefix="whisper_preprocessed_")
+        self.temp_dir = tempfile.mkdtemp(dir=self._get_temp_root())
         logger.info(f"Initialized AudioPreprocessor with temp directory: {self.temp_dir}")
     
+    @classmethod
+    def _get_temp_root(cls) -> str:
+        """
+        Return the shared temp root, creating it on first use.
+        
+        Lives on /dev/shm while get_temp_parent() finds room there, so intermediate
+        files never touch disk, and under the default temp directory otherwise.
+        Can be overridden with the WHISPER_PREPROCESS_TEMP_ROOT env var.
+        
+        Returns:
+            str: Path to the temp root directory
+        """
+        root = os.getenv("WHISPER_PREPROCESS_TEMP_ROOT")
+        if not root:
+            root = os.path.join(get_temp_parent() or tempfile.gettempdir(), "whisper_preprocessed")
+        if root not in cls._temp_roots:
+            os.makedirs(root, exist_ok=True)
+            cls._temp_roots.add(root)
+        return root
+    
     async def preprocess_stereo_audio(self, 
                                     audio_file_path: str, 
                                     original_audio_info: Dict[str, Any]) -> Tuple[bool, List[ChannelInfo], str]:
@@ -33,44 +139,64 @@ class AudioPreprocessor:
         Returns:
             Tuple[bool, List[ChannelInfo], str]: (success, channel_info_list, error_message)
         """
+        # Per-step stats, emitted as a single log line at the end
+        stats: Dict[str, Any] = {"file": audio_file_path}
+        step_start = time.perf_counter()
+        
         try:
-            logger.info(f"Starting audio preprocessing for: {audio_file_path}")
-            
-            # Load the audio file and split into channels
-            logger.info("Step 2a: Loading audio file and splitting into channels")
-            audio_data, sample_rate = self._load_audio_file(audio_file_path)
-            if audio_data is None:
+            # Load the audio file, split into left and right channels (Speaker 2 & Speaker 1)
+            channels_data, sample_rate = self._load_audio_file(audio_file_path)
+            if channels_data is None:
                 return False, [], "Failed to load audio file"
             
-            logger.info(f"Loaded audio: shape={audio_data.shape}, sr={sample_rate}Hz")
+            stats["sample_rate"] = sample_rate
+            stats["load_seconds"] = round(time.perf_counter() - step_start, 3)
+            step_start = time.perf_counter()
             
-            # Trim silence from both channels simultaneously before splitting
-            trimmed_audio_data = self._trim_silence_from_stereo(audio_data, sample_rate)
+            # Mono input has no right channel; trim it against itself
+            left_channel, right_channel = channels_data
+            is_mono = right_channel is None
+            stats["channels"] = 1 if is_mono else 2
             
-            if trimmed_audio_data is None:
+            # Trim silence from both channels simultaneously
+            trimmed_channels = self._trim_silence_from_stereo(
+                left_channel, left_channel if is_mono else right_channel, sample_rate
+            )
+            stats["trim_seconds"] = round(time.perf_counter() - step_start, 3)
+            
+            if trimmed_channels is None:
                 # This audio was determined to be all silent.
                 error_msg = "Audio appears to be all silent."
                 logger.warning(f"{error_msg} Halting processing for {audio_file_path}.")
                 return False, [], error_msg
 
-            # Split into left and right channels (Speaker 1 & Speaker 2)
-            left_channel, right_channel = self._split_stereo_channels(trimmed_audio_data)
+            left_channel, right_channel = trimmed_channels
+            
+            # Process both channels concurrently in worker threads; soxr and
+            # libsndfile release the GIL, so the two channels run in parallel.
+            # Mono input is processed once, as a single speaker.
+            if is_mono:
+                channels = [("mono", left_channel, "Speaker_1")]
+            else:
+                channels = [
+                    ("left", left_channel, "Speaker_2"),
+                    ("right", right_channel, "Speaker_1")
+                ]
+            step_start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            executor = _get_executor()
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    executor, self._process_channel_sync, channel_data, sample_rate, channel_id, speaker_id
+                )
+                for channel_id, channel_data, speaker_id in channels
+            ])
+            stats["channels_seconds"] = round(time.perf_counter() - step_start, 3)
             
-            # Process each channel separately
             channel_info_list = []
             
-            for channel_id, channel_data in [("left", left_channel), ("right", right_channel)]:
-                speaker_id = "Speaker_2" if channel_id == "left" else "Speaker_1"
-                
-                logger.info(f"Step 2b: Processing {channel_id} channel ({speaker_id})")
-                
-                # Process each channel (resample, trim, save as WAV)
-                success, processed_file_path, duration, file_size_mb = await self._process_channel(
-                    channel_data, 
-                    sample_rate, 
-                    channel_id,
-                    speaker_id
-                )
+            for (channel_id, _, speaker_id), result in zip(channels, results):
+                success, processed_file_path, duration, file_size_mb = result
                 
                 if not success:
                     return False, [], f"Failed to process {channel_id} channel"
@@ -86,9 +212,12 @@ class AudioPreprocessor:
                 
                 channel_info_list.append(channel_info)
                 
-                logger.info(f"{channel_id} channel processed: {duration:.2f}s, {file_size_mb:.2f}MB")
+                stats[channel_id] = {
+                    "duration": round(duration, 2),
+                    "file_size_mb": round(file_size_mb, 2)
+                }
             
-            logger.info(f"Audio preprocessing completed for both channels")
+            logger.info("Audio preprocessing completed: %s", json.dumps(stats))
             return True, channel_info_list, ""
             
         except Exception as e:
@@ -96,33 +225,50 @@ class AudioPreprocessor:
             logger.error(error_msg)
             return False, [], error_msg
     
-    def _trim_silence_from_stereo(self, audio_data: np.ndarray, sample_rate: int, silence_threshold: float = 0.01, min_sound_duration_ms: int = 100) -> Optional[np.ndarray]:
+    def _trim_silence_from_stereo(self, 
+                                  left_channel: np.ndarray, 
+                                  right_channel: np.ndarray, 
+                                  sample_rate: int, 
+                                  silence_threshold: float = 0.01, 
+                                  min_sound_duration_ms: int = 100) -> Optional[Tuple[np.ndarray, np.ndarray]]:
         """
         Trims silence from the beginning and end of a stereo audio signal
         based on the combined energy of both channels.
+        
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: Trimmed (left, right) channels, or None if all silent
         """
-        if audio_data.ndim != 2 or audio_data.shape[1] != 2:
-            logger.warning("Audio is not stereo, skipping silence trimming.")
-            return audio_data
+        # Thresholds are given for float audio in [-1, 1]; scale them for integer PCM
+        if left_channel.dtype.kind == 'i':
+            silence_threshold *= np.iinfo(left_channel.dtype).max
         
-        # Calculate the RMS energy of each frame for both channels combined
         frame_length = int(sample_rate * 0.02) # 20ms frames
-        frames = np.lib.stride_tricks.as_strided(
-            audio_data,
-            shape=(audio_data.shape[0] // frame_length, frame_length, 2),
-            strides=(audio_data.strides[0] * frame_length, audio_data.strides[0], audio_data.strides[1])
-        )
-        # Combine energy: mean of squared samples across both channels
-        energy = np.mean(frames**2, axis=(1, 2))
-        
-        # Find where the audio is not silent
-        non_silent_indices = np.where(energy > silence_threshold**2)[0]
         
-        if len(non_silent_indices) == 0:
-            return None
-            
-        start_frame = non_silent_indices[0]
-        end_frame = non_silent_indices[-1]
+        if njit is not None:
+            start_frame, end_frame = _find_non_silent_frames(
+                left_channel, right_channel, frame_length, silence_threshold**2
+            )
+            if start_frame < 0:
+                return None
+        else:
+            # Calculate the RMS energy of each frame for both channels combined.
+            # Reshape each channel to (num_frames, frame_length) and take per-row sums
+            # of squares with einsum (float32 accumulation, so int16 cannot overflow).
+            num_samples = (len(left_channel) // frame_length) * frame_length
+            left_frames = left_channel[:num_samples].reshape(-1, frame_length)
+            right_frames = right_channel[:num_samples].reshape(-1, frame_length)
+            # Compare sums of squares against the threshold scaled by the frame
+            # size instead of dividing every frame's energy (no mean, no sqrt).
+            energy = np.einsum('ij,ij->i', left_frames, left_frames, dtype=np.float32)
+            energy += np.einsum('ij,ij->i', right_frames, right_frames, dtype=np.float32)
+            
+            # Find where the audio is not silent
+            non_silent_indices = np.flatnonzero(energy > silence_threshold**2 * 2 * frame_length)
+            
+            if non_silent_indices.size == 0:
+                return None
+                
+            start_frame, end_frame = int(non_silent_indices[0]), int(non_silent_indices[-1])
         
         start_sample = start_frame * frame_length
         end_sample = (end_frame + 1) * frame_length
@@ -130,71 +276,72 @@ class AudioPreprocessor:
         # Ensure the trimmed audio is not too short
         if (end_sample - start_sample) < (sample_rate * (min_sound_duration_ms / 1000.0)):
             logger.warning("Trimming would result in audio shorter than min duration, skipping.")
-            return audio_data
+            return left_channel, right_channel
         
-        original_duration = audio_data.shape[0] / sample_rate
+        original_duration = len(left_channel) / sample_rate
         trimmed_duration = (end_sample - start_sample) / sample_rate
-        logger.info(f"Trimming stereo silence. Original duration: {original_duration:.2f}s, New duration: {trimmed_duration:.2f}s")
+        logger.debug("Trimming stereo silence. Original duration: %.2fs, New duration: %.2fs", original_duration, trimmed_duration)
         
-        return audio_data[start_sample:end_sample]
+        return left_channel[start_sample:end_sample], right_channel[start_sample:end_sample]
 
-    def _load_audio_file(self, audio_file_path: str) -> Tuple[np.ndarray, int]:
+    def _load_audio_file(self, audio_file_path: str) -> Tuple[Optional[Tuple[np.ndarray, Optional[np.ndarray]]], int]:
         """
-        Load audio file using soundfile.
+        Load audio file using soundfile, decoding block by block straight into
+        one contiguous array per channel.
         
         Args:
             audio_file_path: Path to audio file
             
         Returns:
-            Tuple[np.ndarray, int]: (audio_data, sample_rate) or (None, 0) on error
+            Tuple[Optional[Tuple[np.ndarray, Optional[np.ndarray]]], int]: ((left, right), sample_rate),
+                with right set to None for mono input, or (None, 0) on error
         """
         try:
-            import soundfile as sf
+            # Decode as 16-bit PCM; the output is PCM_16 anyway, and int16 moves a
+            # quarter of the bytes of soundfile's float64 default. Demuxing per block
+            # avoids materializing the interleaved stereo buffer and hands soxr
+            # contiguous channels instead of strided views.
+            with sf.SoundFile(audio_file_path) as f:
+                num_frames = f.frames
+                sample_rate = f.samplerate
+                is_mono = f.channels == 1
+                
+                left_channel = np.empty(num_frames, dtype=np.int16)
+                right_channel = None if is_mono else np.empty(num_frames, dtype=np.int16)
+                
+                pos = 0
+                for block in f.blocks(blocksize=1 << 20, dtype='int16', always_2d=True):
+                    k = block.shape[0]
+                    left_channel[pos:pos + k] = block[:, 0]
+                    if not is_mono:
+                        right_channel[pos:pos + k] = block[:, 1]
+                    pos += k
             
-            # Load audio file
-            audio_data, sample_rate = sf.read(audio_file_path)
+            if pos < num_frames:
+                left_channel = left_channel[:pos]
+                if not is_mono:
+                    right_channel = right_channel[:pos]
             
-            # Ensure we have at least mono audio
-            if audio_data.ndim == 1:
-                # Convert mono to stereo by duplicating the channel
-                audio_data = np.column_stack([audio_data, audio_data])
-                logger.warning("Converted mono audio to stereo by duplicating channel")
+            if is_mono:
+                logger.warning("Mono audio: processing a single channel")
             
-            return audio_data, sample_rate
+            return (left_channel, right_channel), sample_rate
             
         except Exception as e:
             logger.error(f"Error loading audio file {audio_file_path}: {str(e)}")
             return None, 0
     
-    def _split_stereo_channels(self, audio_data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """
-        Split stereo audio into left and right channels.
-        
-        Args:
-            audio_data: Stereo audio data array
-            
-        Returns:
-            Tuple[np.ndarray, np.ndarray]: (left_channel, right_channel)
-        """
-        if audio_data.ndim == 2:
-            left_channel = audio_data[:, 0]
-            right_channel = audio_data[:, 1]
-        else:
-            # If somehow mono, duplicate it
-            left_channel = audio_data
-            right_channel = audio_data.copy()
-        
-        logger.info(f"Split channels: left={left_channel.shape}, right={right_channel.shape}")
-        return left_channel, right_channel
-    
-    async def _process_channel(self, 
-                             channel_data: np.ndarray, 
-                             original_sample_rate: int,
-                             channel_id: str,
-                             speaker_id: str) -> Tuple[bool, str, float, float]:
+    def _process_channel_sync(self, 
+                              channel_data: np.ndarray, 
+                              original_sample_rate: int,
+                              channel_id: str,
+                              speaker_id: str) -> Tuple[bool, str, float, float]:
         """
         Process individual audio channel: resample and save as FLAC.
         
+        The channel is resampled and encoded block by block, so no full-length
+        resampled copy is ever held in memory.
+        
         Args:
             channel_data: Audio data for the channel
             original_sample_rate: Original sample rate
@@ -208,110 +355,85 @@ class AudioPreprocessor:
             # Target sample rate for Whisper (16kHz is optimal)
             target_sample_rate = 16000
             
-            # Resample if needed
             if original_sample_rate != target_sample_rate:
-                logger.info(f"Resampling {channel_id} channel: {original_sample_rate}Hz -> {target_sample_rate}Hz")
-                resampled_audio = self._resample_audio(channel_data, original_sample_rate, target_sample_rate)
-            else:
-                resampled_audio = channel_data
-            
-            # Calculate duration
-            duration = len(resampled_audio) / target_sample_rate
-            logger.info(f"{channel_id} channel duration after processing: {duration:.2f}s")
+                logger.debug("Resampling %s channel: %sHz -> %sHz", channel_id, original_sample_rate, target_sample_rate)
             
             # Save as FLAC file
             output_filename = f"{speaker_id}_{channel_id}.flac"
             output_path = os.path.join(self.temp_dir, output_filename)
             
-            success, file_size_mb = self._save_as_flac(resampled_audio, target_sample_rate, output_path)
+            success, num_frames, file_size_mb = self._save_as_flac(
+                channel_data, original_sample_rate, target_sample_rate, output_path
+            )
             if not success:
                 return False, "", 0.0, 0.0
             
+            # Calculate duration
+            duration = num_frames / target_sample_rate
+            logger.debug("%s channel duration after processing: %.2fs", channel_id, duration)
+            
             return True, output_path, duration, file_size_mb
             
         except Exception as e:
             logger.error(f"Error processing {channel_id} channel: {str(e)}")
             return False, "", 0.0, 0.0
 
-    def _resample_audio(self, audio_data: np.ndarray, original_sr: int, target_sr: int) -> np.ndarray:
+    def _save_as_flac(self, 
+                      audio_data: np.ndarray, 
+                      original_sr: int, 
+                      target_sr: int, 
+                      output_path: str) -> Tuple[bool, int, float]:
         """
-        Resample audio data to target sample rate using SoXR.
+        Resample audio data to the target rate and save it as a FLAC file, streaming
+        fixed-size blocks through SoXR and libsndfile.
         
-        Args:
-            audio_data: Input audio data
-            original_sr: Original sample rate
-            target_sr: Target sample rate
-            
-        Returns:
-            np.ndarray: Resampled audio data
-        """
-        try:
-            import soxr
-            
-            # Use SoXR for fastest, highest-quality resampling
-            resampled = soxr.resample(audio_data, original_sr, target_sr)
-            logger.info(f"Resampled audio with SoXR: {len(audio_data)} -> {len(resampled)} samples")
-            return resampled
-            
-        except ImportError:
-            logger.warning("SoXR not available, falling back to simple interpolation")
-            # Fallback: simple decimation/interpolation
-            ratio = target_sr / original_sr
-            new_length = int(len(audio_data) * ratio)
-            return np.interp(np.linspace(0, len(audio_data), new_length), 
-                           np.arange(len(audio_data)), audio_data)
-        except Exception as e:
-            logger.error(f"Error resampling audio with SoXR: {str(e)}")
-            # Fallback: simple decimation/interpolation
-            ratio = target_sr / original_sr
-            new_length = int(len(audio_data) * ratio)
-            return np.interp(np.linspace(0, len(audio_data), new_length), 
-                           np.arange(len(audio_data)), audio_data)
-
-    def _save_as_flac(self, audio_data: np.ndarray, sample_rate: int, output_path: str) -> Tuple[bool, float]:
-        """
-        Save audio data as FLAC file.
+        SoXR resamples int16 input natively, so the dtype is preserved. When the
+        rates already match, blocks are written as-is.
         
         Args:
             audio_data: Audio data to save
-            sample_rate: Sample rate
+            original_sr: Sample rate of audio_data
+            target_sr: Sample rate of the written file
             output_path: Output file path
             
         Returns:
-            Tuple[bool, float]: (success, file_size_mb)
+            Tuple[bool, int, float]: (success, frames_written, file_size_mb)
         """
         try:
-            import soundfile as sf
-            
-            # Normalize audio to prevent clipping
-            if np.max(np.abs(audio_data)) > 1.0:
-                audio_data = audio_data / np.max(np.abs(audio_data))
-                logger.info("Normalized audio to prevent clipping")
-            
-            # Save as FLAC with 16-bit PCM encoding
-            sf.write(output_path, audio_data, sample_rate, format='FLAC', subtype='PCM_16')
+            # SoXR polyphase resampling in native code. Errors propagate to the caller;
+            # there is no interpolation fallback since it aliases badly.
+            resampler = None
+            if original_sr != target_sr:
+                resampler = soxr.ResampleStream(original_sr, target_sr, 1, dtype=audio_data.dtype, quality='HQ')
+            
+            # Save as FLAC with 16-bit PCM encoding. The file is a short-lived
+            # intermediate, so use the fastest compression level.
+            num_samples = len(audio_data)
+            with sf.SoundFile(output_path, 'w', samplerate=target_sr, channels=1,
+                              format='FLAC', subtype='PCM_16', compression_level=0.0) as f:
+                for start in range(0, num_samples, _STREAM_BLOCK_SIZE):
+                    block = audio_data[start:start + _STREAM_BLOCK_SIZE]
+                    if resampler is not None:
+                        block = resampler.resample_chunk(block, last=start + _STREAM_BLOCK_SIZE >= num_samples)
+                    f.write(block)
+                num_frames = f.frames
             
             # Calculate file size
             file_size_bytes = os.path.getsize(output_path)
             file_size_mb = file_size_bytes / (1024 * 1024)
             
-            logger.info(f"Saved FLAC file: {output_path} ({file_size_mb:.2f}MB)")
-            return True, file_size_mb
+            logger.debug("Saved FLAC file: %s (%d -> %d samples, %.2fMB)", output_path, num_samples, num_frames, file_size_mb)
+            return True, num_frames, file_size_mb
             
         except Exception as e:
             logger.error(f"Error saving FLAC file {output_path}: {str(e)}")
-            return False, 0.0
+            return False, 0, 0.0
 
     def cleanup(self):
-        """Clean up temporary files and directories."""
+        """Clean up this request's temp directory (the shared temp root is kept)."""
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up temp directory: {self.temp_dir}")
         except Exception as e:
-            logger.error(f"Error cleaning up temp directory: {str(e)}")
-
-    def __del__(self):
-        """Destructor to ensure cleanup."""
-        self.cleanup()
\ No newline at end of file
+            logger.error(f"Error cleaning up temp directory: {str(e)}")
\ No newline at end of file
@@ -2,6 +2,7 @@
 Whisper Transcriber for parallel channel-based transcription.
 Handles concurrent transcription with rate limiting to avoid API blocks.
 """
+import os
 import asyncio
 from typing import Dict, List
 from app_whisper.models.schemas import AudioChunk, TranscribedChunk, WhisperTranscriptionResult
@@ -10,14 +11,65 @@ from common_new.logger import get_logger
 
 logger = get_logger("businesslogic")
 
+# Upper bound on Whisper requests in flight per transcriber
+MAX_CONCURRENT_TRANSCRIPTIONS = int(os.getenv("WHISPER_MAX_CONCURRENT_TRANSCRIPTIONS", "8"))
+
 class WhisperTranscriber:
     """Handles parallel Whisper transcription with rate limiting."""
 
-    def __init__(self):
-        """Initialize the Whisper transcriber."""
-        self.whisper_service = AzureOpenAIServiceWhisper(app_id="whisper_app")
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_TRANSCRIPTIONS):
+        """
+        Initialize the Whisper transcriber.
+        
+        Args:
+            max_concurrent: Maximum number of chunks being transcribed at once
+        """
+        self.whisper_service = AzureOpenAIServiceWhisper(app_id="whisper_app", max_connections=max_concurrent)
+        self._semaphore = asyncio.Semaphore(max_concurrent)
         logger.info("Initialized WhisperTranscriber with AzureOpenAIServiceWhisper.")
 
+    async def _transcribe_one_chunk(self, chunk: AudioChunk) -> TranscribedChunk:
+        """
+        Transcribe one chunk once a concurrency slot is free, and parse the result
+        as soon as it arrives so validation overlaps with the uploads still in flight.
+        
+        Args:
+            chunk: The AudioChunk to transcribe
+            
+        Returns:
+            TranscribedChunk: The chunk with its transcription result or error
+        """
+        try:
+            async with self._semaphore:
+                result = await self.whisper_service.transcribe_audio(
+                    chunk.file_path,
+                    response_format="verbose_json",
+                    timestamp_granularities=["segment"] # Only segment is supported
+                )
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Transcription failed for chunk {chunk.file_path}: {error_msg}")
+            return TranscribedChunk(chunk=chunk, error=error_msg)
+
+        if result.get("error"):
+            logger.error(f"Transcription failed for chunk {chunk.file_path}: {result['error']}")
+            return TranscribedChunk(chunk=chunk, error=result["error"])
+
+        try:
+            # The result from a successful verbose_json call will be parsed
+            # by the robust WhisperTranscriptionResult model.
+            transcription_result = WhisperTranscriptionResult(**result)
+            
+            logger.debug(
+                "Successfully transcribed chunk %s: %d segments, text: '%s...'",
+                chunk.file_path, len(transcription_result.segments), transcription_result.text[:100]
+            )
+            
+            return TranscribedChunk(chunk=chunk, transcription_result=transcription_result)
+        except Exception as e:
+            logger.error(f"Failed to parse transcription result for chunk {chunk.file_path}: {e}")
+            return TranscribedChunk(chunk=chunk, error=str(e))
+
     async def transcribe_chunks(self, all_audio_chunks: Dict[str, List[AudioChunk]]) -> List[TranscribedChunk]:
         """
         Transcribes all audio chunks from all speakers concurrently.
@@ -35,54 +87,14 @@ class WhisperTranscriber:
             logger.info("No audio chunks to transcribe.")
             return []
 
-        file_paths = [chunk.file_path for chunk in flat_chunk_list]
-        logger.info(f"Starting transcription for {len(file_paths)} chunks.")
+        logger.info(f"Starting transcription for {len(flat_chunk_list)} chunks.")
 
-        # 2. Create a list of transcription tasks to be run concurrently.
-        tasks = []
-        for file_path in file_paths:
-            task = self.whisper_service.transcribe_audio(
-                file_path,
-                response_format="verbose_json",
-                timestamp_granularities=["segment"] # Only segment is supported
-            )
-            tasks.append(task)
-        
-        # 3. Run all transcription tasks concurrently. asyncio.gather will run them in parallel.
+        # 2. Transcribe and parse every chunk concurrently, at most max_concurrent in flight.
         # The underlying service will handle rate-limiting with the app_counter.
-        transcription_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 4. Map results back to the original chunks
-        transcribed_chunks: List[TranscribedChunk] = []
-        for i, chunk in enumerate(flat_chunk_list):
-            result_or_exc = transcription_results[i]
-
-            if isinstance(result_or_exc, Exception):
-                error_msg = str(result_or_exc)
-                logger.error(f"Transcription failed for chunk {chunk.file_path}: {error_msg}")
-                transcribed_chunks.append(TranscribedChunk(chunk=chunk, error=error_msg))
-            elif result_or_exc.get("error"):
-                logger.error(f"Transcription failed for chunk {chunk.file_path}: {result_or_exc['error']}")
-                transcribed_chunks.append(TranscribedChunk(chunk=chunk, error=result_or_exc["error"]))
-            else:
-                try:
-                    # The result from a successful verbose_json call will be parsed
-                    # by the robust WhisperTranscriptionResult model.
-                    transcription_result = WhisperTranscriptionResult(**result_or_exc)
-                    
-                    # --- Start of new logging ---
-                    num_segments = len(transcription_result.segments)
-                    logger.info(f"Successfully transcribed chunk {chunk.file_path}:")
-                    logger.info(f"  - Text: '{transcription_result.text[:100]}...'")
-                    logger.info(f"  - Metadata: {num_segments} segments found.")
-                    # --- End of new logging ---
-                    
-                    transcribed_chunks.append(
-                        TranscribedChunk(chunk=chunk, transcription_result=transcription_result)
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to parse transcription result for chunk {chunk.file_path}: {e}")
-                    transcribed_chunks.append(TranscribedChunk(chunk=chunk, error=str(e)))
+        # Results come back in chunk order.
+        transcribed_chunks: List[TranscribedChunk] = await asyncio.gather(
+            *[self._transcribe_one_chunk(chunk) for chunk in flat_chunk_list]
+        )
         
-        logger.info(f"Finished transcription for {len(file_paths)} chunks.")
-        return transcribed_chunks
\ No newline at end of file
+        logger.info(f"Finished transcription for {len(flat_chunk_list)} chunks.")
+        return transcribed_chunks
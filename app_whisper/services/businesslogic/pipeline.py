@@ -2,6 +2,9 @@
 Main audio processing pipeline for Azure OpenAI Whisper with channel-based speaker diarization.
 Orchestrates the complete pipeline from audio download to final transcribed output.
 """
+import asyncio
+import gc
+import logging
 import time
 import psutil
 import os
@@ -19,6 +22,23 @@ from common_new.token_client import TokenClient
 
 logger = get_logger("businesslogic")
 
+# Run a full garbage collection after this many processed files instead of after every file
+GC_EVERY_N_FILES = int(os.getenv("WHISPER_GC_EVERY_N_FILES", "10"))
+_files_since_gc = 0
+
+# Audio shorter than this is rejected without being transcribed
+MIN_DURATION_SECONDS = 5.0
+
+# Separator line around each step title in the logs
+_BANNER = "=" * 60
+
+def _log_step(title: str) -> None:
+    """Log a step banner, skipping all three records when INFO is disabled."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(_BANNER)
+        logger.info(title)
+        logger.info(_BANNER)
+
 async def process_audio(filename: str) -> Tuple[bool, InternalWhisperResult]:
     """
     Main entry point for audio processing pipeline with retry logic.
@@ -77,11 +97,12 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
     Returns:
         Tuple[bool, InternalWhisperResult]: (success, result)
     """
+    global _files_since_gc
     process = psutil.Process(os.getpid())
     start_mem = process.memory_info().rss / (1024 * 1024)
     logger.info(f"Pipeline start memory: {start_mem:.2f} MB")
     
-    start_time = time.time()
+    start_time = time.monotonic()
     downloader = None
     preprocessor = None
     chunker = None
@@ -90,12 +111,26 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
     
     try:
         logger.info(f"Starting audio processing pipeline for: {filename}")
+        downloader = AudioFileDownloader()
+        
+        # Step 1a: Reject audio that is too short from its header, before downloading it
+        probed_duration = await downloader.probe_duration(filename)
+        if probed_duration is not None and probed_duration < MIN_DURATION_SECONDS:
+            error_msg = f"Audio file too short for processing: {probed_duration:.2f}s (minimum: {MIN_DURATION_SECONDS}s)"
+            logger.warning(error_msg)
+            return False, InternalWhisperResult(
+                text=f"Audio file rejected: {error_msg}",
+                diarization=False,
+                processing_metadata=ProcessingMetadata(
+                    filename=filename,
+                    processing_time_seconds=time.monotonic() - start_time,
+                    transcription_method="rejected_duration",
+                    chunk_method="none"
+                )
+            )
         
         # Step 1: Download Audio File
-        logger.info("=" * 60)
-        logger.info("STEP 1: Downloading audio file from blob storage")
-        logger.info("=" * 60)
-        downloader = AudioFileDownloader()
+        _log_step("STEP 1: Downloading audio file from blob storage")
         
         success, local_file_path, error_msg = await downloader.download_audio_file(filename)
         if not success:
@@ -105,36 +140,31 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
                 diarization=False,
                 processing_metadata=ProcessingMetadata(
                     filename=filename,
-                    processing_time_seconds=time.time() - start_time,
+                    processing_time_seconds=time.monotonic() - start_time,
                     transcription_method="failed",
                     chunk_method="none"
                 )
             )
         
         # Step 1b: Verify stereo format (optional)
-        logger.info("=" * 60)
-        logger.info("STEP 1b: Verifying audio format")
-        logger.info("=" * 60)
+        _log_step("STEP 1b: Verifying audio format")
         is_stereo, original_audio_info = downloader.verify_stereo_format(local_file_path)
         if not is_stereo:
             logger.warning(f"Audio file is not stereo format, but continuing with processing")
         
         # Step 1c: Check audio duration (skip files shorter than 5 seconds)
-        logger.info("=" * 60)
-        logger.info("STEP 1c: Checking audio duration")
-        logger.info("=" * 60)
+        _log_step("STEP 1c: Checking audio duration")
         audio_duration = original_audio_info.get('duration', 0.0)
-        min_duration = 5.0  # Minimum 5 seconds
         
-        if audio_duration < min_duration:
-            error_msg = f"Audio file too short for processing: {audio_duration:.2f}s (minimum: {min_duration}s)"
+        if audio_duration < MIN_DURATION_SECONDS:
+            error_msg = f"Audio file too short for processing: {audio_duration:.2f}s (minimum: {MIN_DURATION_SECONDS}s)"
             logger.warning(error_msg)
             return False, InternalWhisperResult(
                 text=f"Audio file rejected: {error_msg}",
                 diarization=False,
                 processing_metadata=ProcessingMetadata(
                     filename=filename,
-                    processing_time_seconds=time.time() - start_time,
+                    processing_time_seconds=time.monotonic() - start_time,
                     transcription_method="rejected_duration",
                     chunk_method="none",
                     original_audio_info=original_audio_info
@@ -144,9 +174,7 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
         logger.info(f"Audio duration check passed: {audio_duration:.2f}s")
         
         # Step 2: Preprocess Audio
-        logger.info("=" * 60)
-        logger.info("STEP 2: Preprocessing audio (split channels, resample, trim, convert)")
-        logger.info("=" * 60)
+        _log_step("STEP 2: Preprocessing audio (split channels, resample, trim, convert)")
         preprocessor = AudioPreprocessor()
         
         success, channel_info_list, error_msg = await preprocessor.preprocess_stereo_audio(
@@ -160,7 +188,7 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
                 diarization=False,
                 processing_metadata=ProcessingMetadata(
                     filename=filename,
-                    processing_time_seconds=time.time() - start_time,
+                    processing_time_seconds=time.monotonic() - start_time,
                     transcription_method="failed_preprocessing",
                     chunk_method="none",
                     original_audio_info=original_audio_info
@@ -172,9 +200,7 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
             logger.info(f"  - Channel: {info.channel_id} ({info.speaker_id}), Path: {info.file_path}, Size: {info.file_size_mb:.2f}MB")
 
         # Step 3: Channel-Specific Audio Chunking (if needed)
-        logger.info("=" * 60)
-        logger.info("STEP 3: Creating audio chunks for each channel")
-        logger.info("=" * 60)
+        _log_step("STEP 3: Creating audio chunks for each channel")
         chunker = AudioChunker()
         
         try:
@@ -187,9 +213,7 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
                     logger.info(f"    - Chunk {i+1}: {chunk.file_path} ({chunk.start_time:.2f}s - {chunk.end_time:.2f}s)")
 
             # Step 4: Parallel Whisper Transcription for both channels
-            logger.info("=" * 60)
-            logger.info("STEP 4: Transcribing audio chunks in parallel")
-            logger.info("=" * 60)
+            _log_step("STEP 4: Transcribing audio chunks in parallel")
             transcriber = WhisperTranscriber()
             
             transcribed_chunks = await transcriber.transcribe_chunks(all_audio_chunks)
@@ -202,21 +226,17 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
             logger.info("Transcription step completed.")
 
             # Step 5: Speaker Segment Creation & Alignment
-            logger.info("=" * 60)
-            logger.info("STEP 5: Creating and aligning speaker segments")
-            logger.info("=" * 60)
+            _log_step("STEP 5: Creating and aligning speaker segments")
             diarizer = SpeakerDiarizer()
             final_speaker_segments = diarizer.diarize_and_filter(transcribed_chunks)
 
             # Step 6: Post-Processing & Final Assembly
-            logger.info("=" * 60)
-            logger.info("STEP 6: Post-processing and assembling final transcript")
-            logger.info("=" * 60)
+            _log_step("STEP 6: Post-processing and assembling final transcript")
             postprocessor = TranscriptionPostProcessor()
             final_text = postprocessor.assemble_transcript(final_speaker_segments)
 
             # Create the final result object
-            processing_time = time.time() - start_time
+            processing_time = time.monotonic() - start_time
             result = InternalWhisperResult(
                 text=final_text,
                 diarization=True,
@@ -236,7 +256,7 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
             return True, result
 
         except Exception as e:
-            processing_time = time.time() - start_time
+            processing_time = time.monotonic() - start_time
             logger.error(f"Pipeline failed for {filename} after {processing_time:.2f} seconds: {e}")
             return False, InternalWhisperResult(
                 text=f"Failed during chunking/transcription: {e}",
@@ -252,35 +272,25 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
         
     finally:
         # Step 7: Cleanup temporary files
-        logger.info("=" * 60)
-        logger.info("STEP 7: Cleaning up temporary files")
-        logger.info("=" * 60)
+        _log_step("STEP 7: Cleaning up temporary files")
         
         cleanup_errors = []
         
-        try:
-            if downloader:
-                logger.debug("Cleaning up downloader resources")
-                downloader.cleanup()
-        except Exception as cleanup_error:
-            cleanup_errors.append(f"Downloader cleanup: {cleanup_error}")
-            logger.error(f"Error during downloader cleanup: {cleanup_error}")
-            
-        try:
-            if preprocessor:
-                logger.debug("Cleaning up preprocessor resources")
-                preprocessor.cleanup()
-        except Exception as cleanup_error:
-            cleanup_errors.append(f"Preprocessor cleanup: {cleanup_error}")
-            logger.error(f"Error during preprocessor cleanup: {cleanup_error}")
-            
-        try:
-            if chunker:
-                logger.debug("Cleaning up chunker resources")
-                chunker.cleanup()
-        except Exception as cleanup_error:
-            cleanup_errors.append(f"Chunker cleanup: {cleanup_error}")
-            logger.error(f"Error during chunker cleanup: {cleanup_error}")
+        # Clean up all stages concurrently and off the event loop
+        cleanup_stages = [
+            (name, stage)
+            for name, stage in (("Downloader", downloader), ("Preprocessor", preprocessor), ("Chunker", chunker))
+            if stage
+        ]
+        logger.debug(f"Cleaning up {', '.join(name for name, _ in cleanup_stages)} resources")
+        results = await asyncio.gather(
+            *(asyncio.to_thread(stage.cleanup) for _, stage in cleanup_stages),
+            return_exceptions=True
+        )
+        for (name, _), result in zip(cleanup_stages, results):
+            if isinstance(result, Exception):
+                cleanup_errors.append(f"{name} cleanup: {result}")
+                logger.error(f"Error during {name.lower()} cleanup: {result}")
             
         # Log summary of cleanup
         if cleanup_errors:
@@ -288,10 +298,13 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
         else:
             logger.info("Cleanup completed successfully")
             
-        # Force garbage collection for long-running operations
-        import gc
-        gc.collect()
-        logger.debug("Forced garbage collection after cleanup")
+        # Periodically force a full garbage collection for long-running workers. A full
+        # collection walks the whole heap, so it is not worth paying on every file.
+        _files_since_gc += 1
+        if _files_since_gc >= GC_EVERY_N_FILES:
+            _files_since_gc = 0
+            gc.collect()
+            logger.debug("Forced garbage collection after cleanup")
         
         end_mem = process.memory_info().rss / (1024 * 1024)
         logger.info(f"Pipeline end memory: {end_mem:.2f} MB. Usage delta: {end_mem - start_mem:.2f} MB")
\ No newline at end of file
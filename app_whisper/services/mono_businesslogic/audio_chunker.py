@@ -4,10 +4,13 @@ Handles size-based chunking for large audio files before transcription.
 """
 import math
 import os
+import shutil
 import tempfile
 import soundfile as sf
-from typing import List
+import numpy as np
+from typing import Iterator, List, Optional, Tuple
 from app_whisper.models.schemas import AudioChunk
+from app_whisper.services.temp_storage import get_temp_parent
 from common_new.logger import get_logger
 
 logger = get_logger("businesslogic")
@@ -23,21 +26,39 @@ class AudioChunker:
             max_chunk_size_mb: The maximum size for each chunk in megabytes.
         """
         self.max_chunk_size_mb = max_chunk_size_mb
-        self.temp_dir = tempfile.mkdtemp(prefix="whisper_chunks_")
+        self.temp_dir = tempfile.mkdtemp(prefix="whisper_chunks_", dir=get_temp_parent())
         logger.info(f"Initialized AudioChunker with temp directory: {self.temp_dir}")
         logger.info(f"Max chunk size set to: {self.max_chunk_size_mb} MB")
 
-    def chunk_audio(self, file_path: str, audio_info: dict) -> List[AudioChunk]:
+    def chunk_audio(self, file_path: str, audio_info: dict,
+                    audio: Optional[Tuple[np.ndarray, int]] = None) -> List[AudioChunk]:
         """
         Chunks a mono audio file if it exceeds the size limit.
         
         Args:
             file_path: The path to the mono audio file.
             audio_info: A dictionary containing 'file_size_mb' and 'duration'.
+            audio: Optional (int16 samples, sample_rate) of the file, to skip decoding it.
             
         Returns:
             A list of AudioChunk objects.
         """
+        return list(self.iter_chunks(file_path, audio_info, audio))
+
+    def iter_chunks(self, file_path: str, audio_info: dict,
+                    audio: Optional[Tuple[np.ndarray, int]] = None) -> Iterator[AudioChunk]:
+        """
+        Chunks a mono audio file if it exceeds the size limit, yielding each chunk
+        as soon as its file is written so transcription can start on it.
+        
+        Args:
+            file_path: The path to the mono audio file.
+            audio_info: A dictionary containing 'file_size_mb' and 'duration'.
+            audio: Optional (int16 samples, sample_rate) of the file, to skip decoding it.
+            
+        Yields:
+            AudioChunk objects in time order.
+        """
         logger.info("Starting audio chunking process...")
         
         file_size_mb = audio_info.get('file_size_mb', 0)
@@ -45,12 +66,13 @@ class AudioChunker:
 
         if file_size_mb <= self.max_chunk_size_mb:
             logger.info("No chunking needed. Audio file is within size limits.")
-            return [AudioChunk(
+            yield AudioChunk(
                 file_path=file_path,
                 speaker_id="mono",
                 start_time=0.0,
                 end_time=duration
-            )]
+            )
+            return
 
         logger.info("Chunking required. Audio file exceeds size limit.")
 
@@ -61,12 +83,14 @@ class AudioChunker:
         chunk_duration = duration / num_chunks
         logger.info(f"Total duration is {duration:.2f}s. Each chunk will be ~{chunk_duration:.2f}s.")
         
-        audio_chunks = []
-        try:
-            audio_data, sample_rate = sf.read(file_path)
-        except Exception as e:
-            logger.error(f"Failed to read audio file {file_path}: {e}")
-            raise
+        if audio is not None:
+            audio_data, sample_rate = audio
+        else:
+            try:
+                audio_data, sample_rate = sf.read(file_path, dtype='int16')
+            except Exception as e:
+                logger.error(f"Failed to read audio file {file_path}: {e}")
+                raise
 
         for i in range(num_chunks):
             start_time = i * chunk_duration
@@ -83,33 +107,26 @@ class AudioChunker:
             chunk_filepath = os.path.join(self.temp_dir, chunk_filename)
 
             try:
-                sf.write(chunk_filepath, chunk_audio_data, sample_rate, format='FLAC', subtype='PCM_16')
-                logger.info(f"Saved chunk {i+1} to {chunk_filepath}")
+                sf.write(chunk_filepath, chunk_audio_data, sample_rate, format='FLAC', subtype='PCM_16', compression_level=0.0)
+                logger.debug("Saved chunk %d to %s", i + 1, chunk_filepath)
             except Exception as e:
                 logger.error(f"Failed to write chunk file {chunk_filepath}: {e}")
                 raise
 
-            chunk = AudioChunk(
+            yield AudioChunk(
                 file_path=chunk_filepath,
                 speaker_id="mono",
                 start_time=start_time,
                 end_time=end_time
             )
-            audio_chunks.append(chunk)
 
         logger.info("Audio chunking process completed successfully.")
-        return audio_chunks
 
     def cleanup(self):
         """Clean up the temporary directory used for chunks."""
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up temporary chunk directory: {self.temp_dir}")
         except Exception as e:
-            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
-
-    def __del__(self):
-        """Destructor to ensure cleanup."""
-        self.cleanup()
\ No newline at end of file
+            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
\ No newline at end of file
@@ -4,14 +4,29 @@ Converts Whisper transcription results into speaker-labeled segments.
 """
 
 from common_new.logger import get_logger
-import librosa
 import numpy as np
-import itertools
-from typing import List, Tuple
+import soundfile as sf
+from typing import List, Optional, Tuple
 from app_whisper.models.schemas import SpeakerSegment
 
 logger = get_logger("businesslogic")
 
+
+def _frame_rms(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """
+    RMS energy of each frame of each channel of y (shape (channels, n)), as (channels, frames).
+
+    Same framing as librosa.feature.rms (centered, zero-padded frames), computed over
+    strided views of the padded signal so the overlapping frames are never copied out.
+    """
+    pad = frame_length // 2
+    padded = np.zeros((y.shape[0], y.shape[1] + 2 * pad), dtype=np.float32)
+    padded[:, pad:pad + y.shape[1]] = y
+
+    frames = np.lib.stride_tricks.sliding_window_view(padded, frame_length, axis=-1)[:, ::hop_length]
+    power = np.einsum('cij,cij->ci', frames, frames, dtype=np.float64) / frame_length
+    return np.sqrt(power)
+
 class AudioDiarizer:
     """
     Performs speaker diarization on a stereo audio file where each channel
@@ -36,12 +51,13 @@ class AudioDiarizer:
         self.speaker_ids = ["Speaker_1", "Speaker_2"]
         logger.info(f"Initialized AudioDiarizer with: frame_sec={frame_sec}, hop_sec={hop_sec}, energy_ratio={energy_threshold_ratio}, inertia={inertia_sec}s")
 
-    def diarize(self, file_path: str) -> Tuple[bool, List[SpeakerSegment], str]:
+    def diarize(self, file_path: str, audio: Optional[Tuple[np.ndarray, int]] = None) -> Tuple[bool, List[SpeakerSegment], str]:
         """
         Processes a stereo audio file to generate speaker-labeled segments.
 
         Args:
             file_path: The path to the stereo audio file to be diarized.
+            audio: Already decoded (audio of shape (2, n), sample_rate); when given, file_path is not read.
 
         Returns:
             A tuple containing:
@@ -51,7 +67,12 @@ class AudioDiarizer:
         """
         try:
             logger.info(f"Starting diarization for audio file: {file_path}")
-            y, sr = librosa.load(file_path, sr=None, mono=False)
+            if audio is not None:
+                y, sr = audio
+            else:
+                # libsndfile directly, as (channels, samples) float32
+                y, sr = sf.read(file_path, dtype='float32', always_2d=True)
+                y = y.T
 
             if y.shape[0] != 2:
                 msg = f"Audio file is not stereo (has {y.shape[0]} channels), cannot perform channel-based diarization."
@@ -63,59 +84,58 @@ class AudioDiarizer:
             hop_length = int(self.hop_sec * sr)
             inertia_frames = int(self.inertia_sec / self.hop_sec)
 
-            # --- 2. Calculate RMS energy for each channel ---
-            rms1 = librosa.feature.rms(y=y[0], frame_length=frame_length, hop_length=hop_length)[0]
-            rms2 = librosa.feature.rms(y=y[1], frame_length=frame_length, hop_length=hop_length)[0]
+            # --- 2. Calculate RMS energy for both channels ---
+            rms1, rms2 = _frame_rms(y, frame_length, hop_length)
             
             # --- 3. Determine active speaker per frame (with overlaps) ---
+            # Frame codes: 0 = silence, 1 = first speaker, 2 = second speaker, 3 = overlap
             threshold1 = np.max(rms1) * self.energy_threshold_ratio
             threshold2 = np.max(rms2) * self.energy_threshold_ratio
-            
-            frame_labels = []
-            for i in range(len(rms1)):
-                active1 = rms1[i] > threshold1
-                active2 = rms2[i] > threshold2
-                
-                if active1 and active2:
-                    frame_labels.append("Overlap")
-                elif active1:
-                    frame_labels.append(self.speaker_ids[0])
-                elif active2:
-                    frame_labels.append(self.speaker_ids[1])
-                else:
-                    frame_labels.append("Silence")
+            frame_codes = (rms1 > threshold1).astype(np.int8) + 2 * (rms2 > threshold2).astype(np.int8)
 
             # --- 4. Apply inertia to resolve overlaps ---
-            final_labels = list(frame_labels)
-            for i, label in enumerate(frame_labels):
-                if label == "Overlap":
-                    start = max(0, i - inertia_frames)
-                    window = final_labels[start:i]
-                    
-                    count1 = window.count(self.speaker_ids[0])
-                    count2 = window.count(self.speaker_ids[1])
-                    
+            # count1/count2 hold the speaker counts over the previous `inertia_frames`
+            # final labels and are updated as the window slides, instead of
+            # re-counting the whole window for every frame.
+            final_codes = frame_codes.tolist()
+            louder1 = (rms1 > rms2).tolist()
+            count1 = 0
+            count2 = 0
+            for i, code in enumerate(final_codes):
+                if code == 3:
                     if count1 > count2:
-                        final_labels[i] = self.speaker_ids[0]
+                        code = 1
                     elif count2 > count1:
-                        final_labels[i] = self.speaker_ids[1]
+                        code = 2
                     else: # Tie-breaker: assign to louder speaker in the current frame
-                        final_labels[i] = self.speaker_ids[0] if rms1[i] > rms2[i] else self.speaker_ids[1]
+                        code = 1 if louder1[i] else 2
+                    final_codes[i] = code
+                
+                # Slide the window: add frame i, drop frame i - inertia_frames
+                if code == 1:
+                    count1 += 1
+                elif code == 2:
+                    count2 += 1
+                if i >= inertia_frames:
+                    dropped = final_codes[i - inertia_frames]
+                    if dropped == 1:
+                        count1 -= 1
+                    elif dropped == 2:
+                        count2 -= 1
+            final_codes = np.array(final_codes, dtype=np.int8)
             
             # --- 5. Convert frame labels to time-based segments ---
-            segments = []
-            for speaker, group in itertools.groupby(enumerate(final_labels), key=lambda x: x[1]):
-                if speaker == "Silence":
-                    continue
-                
-                frame_indices = [item[0] for item in group]
-                start_frame = frame_indices[0]
-                end_frame = frame_indices[-1] + 1
-
-                start_time = librosa.frames_to_time(start_frame, sr=sr, hop_length=hop_length)
-                end_time = librosa.frames_to_time(end_frame, sr=sr, hop_length=hop_length)
-                
-                segments.append(SpeakerSegment(start_time=start_time, end_time=end_time, speaker_id=speaker))
+            # Runs of equal codes, bounded where the code changes
+            run_starts = np.concatenate(([0], np.flatnonzero(np.diff(final_codes)) + 1))
+            run_ends = np.append(run_starts[1:], len(final_codes))
+            run_codes = final_codes[run_starts]
+            speech = run_codes != 0
+            start_times = (run_starts[speech] * hop_length / sr).tolist()
+            end_times = (run_ends[speech] * hop_length / sr).tolist()
+            segments = [
+                SpeakerSegment(start_time=start_time, end_time=end_time, speaker_id=self.speaker_ids[code - 1])
+                for start_time, end_time, code in zip(start_times, end_times, run_codes[speech].tolist())
+            ]
 
             logger.info(f"Diarization complete. Found {len(segments)} speaker segments.")
             return True, segments, ""
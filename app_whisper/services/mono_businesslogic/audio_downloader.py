@@ -3,8 +3,11 @@ Audio File Downloader for Azure Blob Storage.
 Downloads audio files from blob storage using the filename as blob name.
 """
 import os
+import shutil
 import tempfile
+import soundfile as sf
 from typing import Tuple, Optional
+from app_whisper.services.temp_storage import get_temp_parent
 from common_new.blob_storage import AsyncBlobStorageDownloader
 from common_new.logger import get_logger
 
@@ -31,7 +34,7 @@ class AudioFileDownloader:
         )
         
         # Create temp directory for downloads
-        self.temp_dir = tempfile.mkdtemp(prefix="whisper_downloads_")
+        self.temp_dir = tempfile.mkdtemp(prefix="whisper_downloads_", dir=get_temp_parent())
         logger.info(f"Initialized AudioFileDownloader with container: {self.container_name}")
         logger.info(f"Using temp directory: {self.temp_dir}")
     
@@ -112,8 +115,6 @@ class AudioFileDownloader:
             Tuple[bool, dict]: (is_stereo, audio_info)
         """
         try:
-            import soundfile as sf
-            
             # Get audio file info
             info = sf.info(file_path)
             
@@ -141,13 +142,8 @@ class AudioFileDownloader:
     def cleanup(self):
         """Clean up temporary downloaded files."""
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up temporary directory: {self.temp_dir}")
         except Exception as e:
-            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
-    
-    def __del__(self):
-        """Cleanup on object destruction."""
-        self.cleanup()
\ No newline at end of file
+            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
\ No newline at end of file
@@ -3,6 +3,7 @@ Transcription Post-Processor for final assembly and formatting.
 Creates diarized transcripts with proper speaker labels and conversation flow.
 """
 
+import numpy as np
 from common_new.logger import get_logger
 from typing import List
 from app_whisper.models.schemas import TranscribedChunk, SpeakerSegment
@@ -83,84 +84,91 @@ class TranscriptionPostProcessor:
         Returns:
             A formatted string representing the final diarized transcript.
         """
-        # 1. Combine all whisper segments with global timestamps
-        all_whisper_segments = []
+        # 1. Combine all whisper segments with global timestamps. Times are kept as
+        # parallel arrays so each chunk's offset is applied in one vectorized add.
+        start_parts = []
+        end_parts = []
+        texts = []
         for tc in transcribed_chunks:
             if tc.transcription_result and tc.transcription_result.segments:
-                for seg in tc.transcription_result.segments:
-                    # Adjust segment time to be absolute from the start of the original audio
-                    global_start = tc.chunk.start_time + seg.start
-                    global_end = tc.chunk.start_time + seg.end
-                    # Ignore very short or empty segments
-                    if seg.text.strip() and (global_end - global_start) > 0.1:
-                        all_whisper_segments.append({
-                            'start': global_start,
-                            'end': global_end,
-                            'text': seg.text.strip()
-                        })
+                segments = tc.transcription_result.segments
+                count = len(segments)
+                # Adjust segment times to be absolute from the start of the original audio
+                global_starts = np.fromiter((seg.start for seg in segments), dtype=np.float64, count=count) + tc.chunk.start_time
+                global_ends = np.fromiter((seg.end for seg in segments), dtype=np.float64, count=count) + tc.chunk.start_time
+                stripped_texts = [seg.text.strip() for seg in segments]
+                # Ignore very short or empty segments
+                keep = ((global_ends - global_starts) > 0.1) & np.fromiter(
+                    (bool(text) for text in stripped_texts), dtype=bool, count=count
+                )
+                start_parts.append(global_starts[keep])
+                end_parts.append(global_ends[keep])
+                texts.extend(text for text, kept in zip(stripped_texts, keep.tolist()) if kept)
         
-        # Sort all segments by their start time to ensure chronological order
-        all_whisper_segments.sort(key=lambda x: x['start'])
-        
-        if not all_whisper_segments:
+        if not texts:
             logger.warning("No valid Whisper segments found to process.")
             return ""
 
-        # 2. Assign a speaker to each whisper segment based on overlap
-        speaker_assigned_segments = []
-        for whisper_seg in all_whisper_segments:
+        # Sort all segments by their start time to ensure chronological order
+        all_starts = np.concatenate(start_parts)
+        order = np.argsort(all_starts, kind='stable')
+        all_starts = all_starts[order].tolist()
+        all_ends = np.concatenate(end_parts)[order].tolist()
+        all_texts = [texts[i] for i in order.tolist()]
+
+        # 2. Assign a speaker to each whisper segment based on overlap. Speakers are kept
+        # in a list parallel to all_texts rather than in per-segment dicts.
+        assigned_speakers = []
+        # Read the diarization fields once instead of per whisper segment
+        diarization_spans = [(d.start_time, d.end_time, d.speaker_id) for d in diarization_segments]
+        for seg_start, seg_end, seg_text in zip(all_starts, all_ends, all_texts):
             overlap_scores = {}
-            for diar_seg in diarization_segments:
+            for diar_start, diar_end, diar_speaker in diarization_spans:
                 # Initialize speaker score if not present
-                if diar_seg.speaker_id not in overlap_scores:
-                    overlap_scores[diar_seg.speaker_id] = 0
+                if diar_speaker not in overlap_scores:
+                    overlap_scores[diar_speaker] = 0
 
                 # Calculate the duration of overlap between the whisper segment and the diarization segment
-                overlap_start = max(whisper_seg['start'], diar_seg.start_time)
-                overlap_end = min(whisper_seg['end'], diar_seg.end_time)
+                overlap_start = max(seg_start, diar_start)
+                overlap_end = min(seg_end, diar_end)
                 overlap_duration = max(0, overlap_end - overlap_start)
                 
                 if overlap_duration > 0:
-                    overlap_scores[diar_seg.speaker_id] += overlap_duration
+                    overlap_scores[diar_speaker] += overlap_duration
             
             # Find the speaker with the maximum overlap
             if any(score > 0 for score in overlap_scores.values()):
                 dominant_speaker = max(overlap_scores, key=overlap_scores.get)
             else:
                 dominant_speaker = "Unknown"
-                logger.warning(f"Could not assign a speaker to segment: '{whisper_seg['text']}'")
+                logger.warning(f"Could not assign a speaker to segment: '{seg_text}'")
 
-            speaker_assigned_segments.append({
-                'speaker': dominant_speaker,
-                'text': whisper_seg['text']
-            })
+            assigned_speakers.append(dominant_speaker)
             
         # 3. Concatenate and clean consecutive segments from the same speaker
-        if not speaker_assigned_segments:
+        if not assigned_speakers:
             return ""
 
+        # Each speaker turn is a (speaker, text) tuple
         final_dialogue = []
-        current_speaker = speaker_assigned_segments[0]['speaker']
-        current_text = speaker_assigned_segments[0]['text']
+        current_speaker = assigned_speakers[0]
+        current_text = all_texts[0]
 
-        for i in range(1, len(speaker_assigned_segments)):
-            next_speaker = speaker_assigned_segments[i]['speaker']
-            next_text = speaker_assigned_segments[i]['text']
-            
+        for next_speaker, next_text in zip(assigned_speakers[1:], all_texts[1:]):
             if next_speaker == current_speaker:
                 current_text += " " + next_text
             else:
                 condensed_text = self._condense_repetitions(current_text)
-                final_dialogue.append({'speaker': current_speaker, 'text': condensed_text})
+                final_dialogue.append((current_speaker, condensed_text))
                 current_speaker = next_speaker
                 current_text = next_text
         
         # Add the last assembled segment
         condensed_text = self._condense_repetitions(current_text)
-        final_dialogue.append({'speaker': current_speaker, 'text': condensed_text})
+        final_dialogue.append((current_speaker, condensed_text))
         
         # 4. Format the final transcript
-        transcript_lines = [f"{segment['speaker']}: {segment['text']}" for segment in final_dialogue]
+        transcript_lines = [f"{speaker}: {text}" for speaker, text in final_dialogue]
         final_transcript = "\n".join(transcript_lines)
         
         logger.info(f"Successfully assembled final transcript with {len(final_dialogue)} speaker turns.")
@@ -3,26 +3,78 @@ Audio Preprocessor for channel-based speaker diarization.
 """
 
 from common_new.logger import get_logger
+from app_whisper.services.temp_storage import get_temp_parent
 import os
+import shutil
 import tempfile
-import librosa
 import numpy as np
 import soundfile as sf
-from typing import Tuple
+import soxr
+from typing import Dict, Optional, Tuple
 
 logger = get_logger("mono_businesslogic_preprocessor")
 
+
+def _to_pcm16(audio: np.ndarray) -> np.ndarray:
+    """Quantize float audio in [-1, 1] to int16 in one pass, so libsndfile only copies it."""
+    scaled = np.multiply(audio, 32768.0, dtype=np.float32)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -32768.0, 32767.0, out=scaled)
+    return scaled.astype(np.int16, order='C')
+
+
+def _non_silent_intervals(y: np.ndarray, top_db: float,
+                          frame_length: int = 2048, hop_length: int = 512) -> np.ndarray:
+    """
+    Find the (start, end) sample intervals of y that are within top_db of its loudest frame.
+
+    Same framing and threshold as librosa.effects.split (centered, zero-padded frames,
+    RMS referenced to the maximum), but frame energies are summed from per-hop sums
+    of squares, so each sample is squared once instead of once per overlapping frame.
+    """
+    hops_per_frame = frame_length // hop_length
+    num_frames = 1 + len(y) // hop_length
+
+    # Centered frames: frame_length // 2 zeros in front, zeros after to fill the last frame
+    padded = np.zeros((num_frames + hops_per_frame - 1) * hop_length, dtype=np.float32)
+    offset = frame_length // 2
+    padded[offset:offset + len(y)] = y
+
+    hops = padded.reshape(-1, hop_length)
+    hop_energy = np.einsum('ij,ij->i', hops, hops, dtype=np.float64)
+    frame_energy = np.lib.stride_tricks.sliding_window_view(hop_energy, hops_per_frame).sum(axis=1)
+
+    # Mean power in dB relative to the loudest frame, with librosa's amplitude floor (1e-5)
+    power = np.maximum(frame_energy / frame_length, 1e-10)
+    non_silent = power > power.max() * 10.0 ** (-top_db / 10.0)
+
+    # Frame indices where the mask flips, closed off at either end if non-silent there
+    edges = np.flatnonzero(np.diff(non_silent.astype(np.int8))) + 1
+    if non_silent[0]:
+        edges = np.concatenate(([0], edges))
+    if non_silent[-1]:
+        edges = np.concatenate((edges, [num_frames]))
+
+    return np.minimum(edges * hop_length, len(y)).reshape(-1, 2)
+
 class AudioPreprocessor:
     """Preprocesses stereo audio for channel-based speaker diarization."""
     
     def __init__(self):
         """Initializes the preprocessor and creates a temporary directory for output files."""
-        self.temp_dir = tempfile.mkdtemp(prefix="whisper_preprocessed_")
+        self.temp_dir = tempfile.mkdtemp(prefix="whisper_preprocessed_", dir=get_temp_parent())
+        # 16-bit PCM written by process_to_mono_flac, keyed by the FLAC path
+        self._mono_audio: Dict[str, Tuple[np.ndarray, int]] = {}
         logger.info(f"Initialized AudioPreprocessor with temp directory: {self.temp_dir}")
 
-    def remove_silence_from_stereo(self, file_path: str, top_db: int = 40) -> Tuple[bool, str, str]:
+    def remove_silence_from_stereo(self, file_path: str, top_db: int = 40,
+                                   keep_wav: bool = False) -> Tuple[bool, Optional[Tuple[np.ndarray, int]], str]:
         """
-        Removes periods where both channels are silent from a stereo audio file.
+        Removes periods where both channels are silent from a stereo audio file
+        (or where the only channel is silent, for mono input).
+
+        The silence-removed audio is returned in memory, to be handed to the diarizer
+        and process_to_mono_flac. It is only written to disk when keep_wav is True.
 
         It works by creating a mono representation that is loud if *either* channel is loud,
         then finds the non-silent parts of that mono track and uses those timings to clip
@@ -31,59 +83,81 @@ class AudioPreprocessor:
         Args:
             file_path: Path to the input stereo audio file.
             top_db: The threshold (in dB) below the peak to consider as silence.
+            keep_wav: Also write the silence-removed audio to a WAV file (for debugging).
 
         Returns:
-            Tuple[bool, str, str]: (success, output_file_path, error_message)
+            Tuple[bool, Optional[Tuple[np.ndarray, int]], str]: (success, (audio of shape
+            (channels, n), sample_rate), error_message). The audio is None if nothing is left.
         """
         try:
             logger.info(f"Starting silence removal for {file_path} with top_db={top_db}")
             
-            y, sr = librosa.load(file_path, sr=None, mono=False)
+            y, sr = sf.read(file_path, dtype='float32', always_2d=True)
+            y = y.T
 
-            if y.shape[0] != 2:
-                msg = f"Audio file {file_path} is not stereo (has {y.shape[0]} channels), cannot remove shared silence."
+            if y.shape[0] not in (1, 2):
+                msg = f"Audio file {file_path} is neither mono nor stereo (has {y.shape[0]} channels), cannot remove shared silence."
                 logger.error(msg)
-                return False, "", msg
+                return False, None, msg
             
             y_mono_for_split = np.max(np.abs(y), axis=0)
             
-            non_silent_intervals = librosa.effects.split(y_mono_for_split, top_db=top_db)
+            non_silent_intervals = _non_silent_intervals(y_mono_for_split, top_db=top_db)
             
             if len(non_silent_intervals) == 0:
                 msg = f"The entire audio file {file_path} was detected as silent."
                 logger.warning(msg)
-                # Return success but with an empty path to indicate no audio is left.
-                return True, "", "File is entirely silent"
+                # Return success but without audio to indicate no audio is left.
+                return True, None, "File is entirely silent"
+
+            if len(non_silent_intervals) == 1 and tuple(non_silent_intervals[0]) == (0, y.shape[1]):
+                # Nothing to remove: hand back the decoded input as it is
+                logger.info(f"No shared silence found in {file_path}; using the original audio.")
+                return True, (y, sr), ""
 
             y_trimmed = np.concatenate([y[:, start:end] for start, end in non_silent_intervals], axis=1)
 
-            original_basename = os.path.splitext(os.path.basename(file_path))[0]
-            output_filename = f"{original_basename}_silence_removed.wav"
-            output_filepath = os.path.join(self.temp_dir, output_filename)
-            
-            sf.write(output_filepath, y_trimmed.T, sr, format='WAV', subtype='PCM_16')
+            if keep_wav:
+                original_basename = os.path.splitext(os.path.basename(file_path))[0]
+                output_filepath = os.path.join(self.temp_dir, f"{original_basename}_silence_removed.wav")
+                sf.write(output_filepath, _to_pcm16(y_trimmed.T), sr, format='WAV', subtype='PCM_16')
+                logger.info(f"Saved silence-removed file to: {output_filepath}")
             
-            original_duration = librosa.get_duration(y=y, sr=sr)
-            trimmed_duration = librosa.get_duration(y=y_trimmed, sr=sr)
+            original_duration = y.shape[1] / sr
+            trimmed_duration = y_trimmed.shape[1] / sr
             removed_duration = original_duration - trimmed_duration
             
             logger.info(f"Silence removal complete. Original: {original_duration:.2f}s, New: {trimmed_duration:.2f}s, Removed: {removed_duration:.2f}s.")
-            logger.info(f"Saved silence-removed file to: {output_filepath}")
             
-            return True, output_filepath, ""
+            return True, (y_trimmed, sr), ""
 
         except Exception as e:
             error_msg = f"Error during silence removal for {file_path}: {str(e)}"
             logger.error(error_msg)
-            return False, "", error_msg
+            return False, None, error_msg
+
+    def pop_mono_audio(self, file_path: str) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Returns and forgets the 16-bit PCM samples of a FLAC written by process_to_mono_flac.
+
+        Args:
+            file_path: The FLAC path returned by process_to_mono_flac.
+
+        Returns:
+            Optional[Tuple[np.ndarray, int]]: (int16 samples, sample_rate), or None if not cached.
+        """
+        return self._mono_audio.pop(file_path, None)
 
-    def process_to_mono_flac(self, file_path: str, target_sr: int = 16000) -> Tuple[bool, str, str, dict]:
+    def process_to_mono_flac(self, file_path: str, target_sr: int = 16000,
+                             audio: Optional[Tuple[np.ndarray, int]] = None) -> Tuple[bool, str, str, dict]:
         """
         Converts an audio file to a mono, 16kHz FLAC file.
 
         Args:
-            file_path: Path to the input audio file.
+            file_path: Path to the input audio file; also names the output file.
             target_sr: The target sample rate.
+            audio: Already decoded (audio of shape (channels, n), sample_rate), such as the
+                output of remove_silence_from_stereo; when given, file_path is not read.
 
         Returns:
             Tuple[bool, str, str, dict]: (success, output_file_path, error_message, audio_info)
@@ -91,20 +165,34 @@ class AudioPreprocessor:
         try:
             logger.info(f"Starting mono conversion and resampling for {file_path} to {target_sr}Hz.")
             
-            # Load the file, converting to mono and resampling to the target sample rate
-            y, sr = librosa.load(file_path, sr=target_sr, mono=True)
+            # Load the file (or take the decoded audio) and downmix to mono
+            if audio is not None:
+                y_stereo, sr = audio
+                y = y_stereo.mean(axis=0)
+            else:
+                y, sr = sf.read(file_path, dtype='float32', always_2d=True)
+                y = y.mean(axis=1)
+            
+            # Resample to the target rate with SoXR
+            if sr != target_sr:
+                y = soxr.resample(y, sr, target_sr, quality='HQ')
+                sr = target_sr
             
             # Create the output path
             original_basename = os.path.splitext(os.path.basename(file_path))[0]
             output_filename = f"{original_basename}_mono_16k.flac"
             output_filepath = os.path.join(self.temp_dir, output_filename)
             
-            # Write the mono, resampled audio to a FLAC file
-            sf.write(output_filepath, y, sr, format='FLAC', subtype='PCM_16')
+            # Write the mono, resampled audio to a FLAC file (fastest compression level,
+            # the file only lives until the chunker/transcriber are done with it). The
+            # samples are kept so the chunker can split them without decoding the file.
+            pcm = _to_pcm16(y)
+            sf.write(output_filepath, pcm, sr, format='FLAC', subtype='PCM_16', compression_level=0.0)
+            self._mono_audio[output_filepath] = (pcm, sr)
             
             # Gather info about the processed file
             file_size_mb = os.path.getsize(output_filepath) / (1024 * 1024)
-            duration = librosa.get_duration(y=y, sr=sr)
+            duration = len(y) / sr
             
             audio_info = {
                 'sample_rate': sr,
@@ -127,13 +215,8 @@ class AudioPreprocessor:
     def cleanup(self):
         """Clean up the temporary directory used for preprocessed files."""
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 logger.info(f"Cleaned up temporary preprocessor directory: {self.temp_dir}")
         except Exception as e:
-            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
-
-    def __del__(self):
-        """Destructor to ensure cleanup."""
-        self.cleanup()
\ No newline at end of file
+            logger.error(f"Error cleaning up temp directory {self.temp_dir}: {str(e)}")
\ No newline at end of file
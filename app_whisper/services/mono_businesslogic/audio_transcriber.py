@@ -2,32 +2,99 @@
 Whisper Transcriber for parallel channel-based transcription.
 Handles concurrent transcription with rate limiting to avoid API blocks.
 """
+import os
 import asyncio
-from typing import List, Optional
+import random
+from typing import Iterator, List, Optional
+from openai import RateLimitError
 from app_whisper.models.schemas import AudioChunk, TranscribedChunk, WhisperTranscriptionResult
 from common_new.azure_openai_service import AzureOpenAIServiceWhisper
-from common_new.token_client import TokenClient
 from common_new.logger import get_logger
 
 logger = get_logger("mono_businesslogic_transcriber")
 
+# Upper bound on Whisper requests in flight per transcriber
+MAX_CONCURRENT_TRANSCRIPTIONS = int(os.getenv("WHISPER_MAX_CONCURRENT_TRANSCRIPTIONS", "8"))
+# Attempts per chunk when Azure answers 429, and the cap on the jittered backoff between them
+RATE_LIMIT_MAX_ATTEMPTS = int(os.getenv("WHISPER_RATE_LIMIT_MAX_ATTEMPTS", "5"))
+RATE_LIMIT_MAX_BACKOFF_SECONDS = float(os.getenv("WHISPER_RATE_LIMIT_MAX_BACKOFF_SECONDS", "30"))
+# Deadline for transcribing one chunk, so a single stalled request cannot hold up the file
+CHUNK_TIMEOUT_SECONDS = float(os.getenv("WHISPER_CHUNK_TIMEOUT_SECONDS", "600"))
+# Consecutive successes needed before a reduced concurrency limit is raised by one
+RATE_LIMIT_RECOVERY_STREAK = int(os.getenv("WHISPER_RATE_LIMIT_RECOVERY_STREAK", "10"))
+
+class _AdaptiveConcurrencyLimit:
+    """
+    Limits in-flight transcriptions. The limit is halved whenever Azure rate limits
+    a request and raised by one again after a streak of successes, up to max_limit.
+    """
+
+    def __init__(self, max_limit: int, recovery_streak: int = RATE_LIMIT_RECOVERY_STREAK):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self._recovery_streak = recovery_streak
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        """Counts a successful request and raises a reduced limit after a full streak."""
+        self._successes += 1
+        if self.limit < self.max_limit and self._successes >= self._recovery_streak:
+            self.limit += 1
+            self._successes = 0
+            logger.info(f"Raised Whisper concurrency limit to {self.limit}")
+
+    def on_rate_limited(self) -> None:
+        """Halves the limit after Azure rejects a request with 429."""
+        self._successes = 0
+        if self.limit > 1:
+            self.limit = max(1, self.limit // 2)
+            logger.warning(f"Whisper rate limited, lowered concurrency limit to {self.limit}")
+
 class WhisperTranscriber:
     """Handles parallel Whisper transcription for a list of audio chunks."""
     
-    def __init__(self, app_id: str = "whisper_app"):
+    def __init__(self, app_id: str = "whisper_app", max_concurrent: int = MAX_CONCURRENT_TRANSCRIPTIONS):
         """
         Initializes the WhisperTranscriber.
 
         Args:
             app_id: The application ID for the token client, used for rate limiting.
+            max_concurrent: Maximum number of chunks being transcribed at once.
         """
-        self.token_client = TokenClient(app_id=app_id)
-        self.whisper_service = AzureOpenAIServiceWhisper(token_client=self.token_client)
+        self.whisper_service = AzureOpenAIServiceWhisper(app_id=app_id, max_connections=max_concurrent)
+        self.token_client = self.whisper_service.token_client
+        self._max_concurrent = max_concurrent
+        self._limit = _AdaptiveConcurrencyLimit(max_concurrent)
         logger.info("Initialized WhisperTranscriber.")
 
+    async def warmup(self) -> None:
+        """
+        Opens one connection per concurrent transcription slot ahead of the first upload.
+        Errors are only logged, as without a warmup the first uploads connect themselves.
+        """
+        try:
+            await self.whisper_service.warmup(self._max_concurrent)
+        except Exception as e:
+            logger.warning(f"Whisper connection warmup failed: {e}")
+
     async def _transcribe_one_chunk(self, chunk: AudioChunk, language: Optional[str]) -> TranscribedChunk:
         """
-        Transcribes a single audio chunk using the Whisper service.
+        Transcribes a single audio chunk using the Whisper service. Requests that Azure
+        rate limits are retried with jittered exponential backoff, outside the
+        concurrency limit, which shrinks until the service stops rejecting.
 
         Args:
             chunk: The AudioChunk to transcribe.
@@ -36,28 +103,59 @@ class WhisperTranscriber:
         Returns:
             A TranscribedChunk object containing the result.
         """
-        logger.info(f"Starting transcription for chunk: {chunk.file_path} ({chunk.start_time:.2f}s - {chunk.end_time:.2f}s)")
+        for attempt in range(RATE_LIMIT_MAX_ATTEMPTS):
+            try:
+                # Wait for a concurrency slot so only the current limit of uploads is in flight
+                async with self._limit:
+                    result = await self._request_transcription(chunk, language)
+                self._limit.on_success()
+                return result
+            except RateLimitError as e:
+                self._limit.on_rate_limited()
+                if attempt == RATE_LIMIT_MAX_ATTEMPTS - 1:
+                    error_msg = f"Transcription of {chunk.file_path} was rate limited {RATE_LIMIT_MAX_ATTEMPTS} times: {str(e)}"
+                    logger.error(error_msg)
+                    return TranscribedChunk(chunk=chunk, error=error_msg)
+                delay = random.uniform(0, min(RATE_LIMIT_MAX_BACKOFF_SECONDS, 2 ** attempt))
+                logger.warning(f"Chunk {chunk.file_path} rate limited (attempt {attempt + 1}/{RATE_LIMIT_MAX_ATTEMPTS}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _request_transcription(self, chunk: AudioChunk, language: Optional[str]) -> TranscribedChunk:
+        """
+        Sends one transcription request for a chunk. Rate limit errors are raised to
+        the caller for retrying; any other failure is returned as a chunk error.
+        """
+        logger.debug("Starting transcription for chunk: %s (%.2fs - %.2fs)", chunk.file_path, chunk.start_time, chunk.end_time)
         try:
             # Request verbose JSON with segment-level timestamps for diarization mapping.
-            transcription_result_dict = await self.whisper_service.transcribe_audio(
-                audio_file_path=chunk.file_path,
-                language=language,
-                prompt=None,
-                temperature=0.0,
-                response_format="verbose_json",
-                timestamp_granularities=["segment"]
+            transcription_result_dict = await asyncio.wait_for(
+                self.whisper_service.transcribe_audio(
+                    audio_file_path=chunk.file_path,
+                    language=language,
+                    prompt=None,
+                    temperature=0.0,
+                    response_format="verbose_json",
+                    timestamp_granularities=["segment"]
+                ),
+                timeout=CHUNK_TIMEOUT_SECONDS
             )
 
             if transcription_result_dict and "text" in transcription_result_dict:
                 # The result is already a dict, so we can validate it directly.
                 transcription_result = WhisperTranscriptionResult.model_validate(transcription_result_dict)
-                logger.info(f"Successfully transcribed chunk: {chunk.file_path}")
+                logger.debug("Successfully transcribed chunk: %s", chunk.file_path)
                 return TranscribedChunk(chunk=chunk, transcription_result=transcription_result)
             else:
                 error_msg = f"Transcription returned an invalid or empty result: {transcription_result_dict}"
                 logger.error(f"Failed to transcribe chunk {chunk.file_path}: {error_msg}")
                 return TranscribedChunk(chunk=chunk, error=error_msg)
 
+        except RateLimitError:
+            raise
+        except asyncio.TimeoutError:
+            error_msg = f"Transcription of {chunk.file_path} timed out after {CHUNK_TIMEOUT_SECONDS:.0f}s"
+            logger.error(error_msg)
+            return TranscribedChunk(chunk=chunk, error=error_msg)
         except Exception as e:
             error_msg = f"An unexpected error occurred during transcription of {chunk.file_path}: {str(e)}"
             logger.error(error_msg, exc_info=True)
@@ -65,7 +163,8 @@ class WhisperTranscriber:
 
     async def transcribe_chunks(self, chunks: List[AudioChunk], language: Optional[str] = None) -> List[TranscribedChunk]:
         """
-        Transcribes a list of audio chunks concurrently.
+        Transcribes a list of audio chunks concurrently, with at most
+        max_concurrent requests in flight at a time (fewer while Azure is rate limiting).
 
         Args:
             chunks: A list of AudioChunk objects to be transcribed.
@@ -86,4 +185,53 @@ class WhisperTranscriber:
         
         logger.info(f"Finished transcription for all {len(chunks)} chunks.")
         
-        return transcribed_chunks
\ No newline at end of file
+        return transcribed_chunks
+
+    async def transcribe_chunk_stream(self, chunks: Iterator[AudioChunk], language: Optional[str] = None) -> List[TranscribedChunk]:
+        """
+        Transcribes chunks while they are still being produced. The iterator is drained
+        in a worker thread and each chunk is submitted for transcription as soon as it
+        is yielded, so chunking overlaps with the uploads already in flight.
+
+        Args:
+            chunks: An iterator of AudioChunk objects, e.g. AudioChunker.iter_chunks.
+            language: The language of the audio. If None, Whisper will detect it.
+
+        Returns:
+            A list of TranscribedChunk objects in the order the chunks were produced.
+
+        Raises:
+            Exception: Any error raised by the chunk iterator, after in-flight
+                transcriptions are cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def _produce():
+            try:
+                for chunk in chunks:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            finally:
+                # Sentinel marks the end of the stream, also when chunking fails
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        producer = asyncio.create_task(asyncio.to_thread(_produce))
+        tasks = []
+        while (chunk := await queue.get()) is not None:
+            tasks.append(asyncio.create_task(self._transcribe_one_chunk(chunk, language)))
+
+        try:
+            await producer
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        if not tasks:
+            logger.warning("No chunks provided to transcribe.")
+            return []
+
+        transcribed_chunks = await asyncio.gather(*tasks)
+        logger.info(f"Finished transcription for all {len(tasks)} chunks.")
+        return transcribed_chunks
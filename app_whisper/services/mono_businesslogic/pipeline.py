@@ -4,25 +4,69 @@ Orchestrates the complete pipeline from audio download to final transcribed outp
 """
 
 from common_new.logger import get_logger
-from common_new.retry_helpers import with_token_limit_retry
-from common_new.token_client import TokenClient
-from typing import Tuple
-from app_whisper.models.schemas import InternalWhisperResult, ProcessingMetadata
+from typing import Optional, Tuple
+from app_whisper.models.schemas import InternalWhisperResult, ProcessingMetadata, SpeakerSegment
 from app_whisper.services.businesslogic.audio_downloader import AudioFileDownloader
 from app_whisper.services.mono_businesslogic.audio_preprocessor import AudioPreprocessor
 from app_whisper.services.mono_businesslogic.audio_diarizer import AudioDiarizer
 from app_whisper.services.mono_businesslogic.audio_chunker import AudioChunker
 from app_whisper.services.mono_businesslogic.audio_transcriber import WhisperTranscriber
 from app_whisper.services.mono_businesslogic.audio_postprocessor import TranscriptionPostProcessor
+import asyncio
 import time
 import psutil
 import os
 
 logger = get_logger("businesslogic")
 
+# Files run through the pipeline at once; each holds its audio in memory and a temp
+# directory on disk, so further files wait for a slot instead of piling up
+MAX_CONCURRENT_PIPELINES = int(os.getenv("WHISPER_MAX_CONCURRENT_PIPELINES", "4"))
+_pipeline_semaphore: Optional[asyncio.Semaphore] = None
+
+# Pipeline stages that hold no per-file state, shared across process_audio calls
+_diarizer: Optional[AudioDiarizer] = None
+_transcriber: Optional[WhisperTranscriber] = None
+_post_processor: Optional[TranscriptionPostProcessor] = None
+# Opens the Whisper connections once, when the shared transcriber is created. It runs in
+# the background and is never awaited, so uploads that start first connect themselves.
+_warmup_task: Optional[asyncio.Task] = None
+
+def _get_shared_stages() -> Tuple[AudioDiarizer, WhisperTranscriber, TranscriptionPostProcessor]:
+    """
+    Get the shared diarizer, transcriber and post-processor, creating them on first use.
+    
+    Creation is synchronous, so concurrent pipelines on the event loop cannot race here.
+    Sharing the transcriber also makes its concurrency limit apply across all files.
+    On creation, the transcriber's connection warmup is started in the background.
+    
+    Returns:
+        Tuple[AudioDiarizer, WhisperTranscriber, TranscriptionPostProcessor]: The shared stages
+    """
+    global _diarizer, _transcriber, _post_processor, _warmup_task
+    if _diarizer is None:
+        # Assign together so a failed construction leaves nothing half-initialized
+        _diarizer, _transcriber, _post_processor = (
+            AudioDiarizer(), WhisperTranscriber(), TranscriptionPostProcessor()
+        )
+        _warmup_task = asyncio.create_task(_transcriber.warmup())
+    return _diarizer, _transcriber, _post_processor
+
+def _get_pipeline_semaphore() -> asyncio.Semaphore:
+    """
+    Get the semaphore bounding concurrent pipelines, creating it on first use.
+    
+    Returns:
+        asyncio.Semaphore: The shared pipeline semaphore
+    """
+    global _pipeline_semaphore
+    if _pipeline_semaphore is None:
+        _pipeline_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PIPELINES)
+    return _pipeline_semaphore
+
 async def process_audio(filename: str) -> Tuple[bool, InternalWhisperResult]:
     """
-    Main entry point for audio processing pipeline with retry logic.
+    Main entry point for audio processing pipeline.
     This function is called by data_processor.py
     
     Args:
@@ -31,42 +75,49 @@ async def process_audio(filename: str) -> Tuple[bool, InternalWhisperResult]:
     Returns:
         Tuple[bool, InternalWhisperResult]: (success, result)
     """
-    # Create a token client for pipeline-level retry logic
-    token_client = TokenClient(app_id="whisper_app")
-    
-    # Wrapper function for retry logic
-    async def _do_pipeline_processing():
-        return await run_pipeline(filename)
-    
+    # Rate limits are retried per Whisper request and blob downloads per attempt, so
+    # the pipeline itself is not re-run (which would redo download and preprocessing)
     try:
-        # Use retry logic for the entire pipeline to handle rate limits and transient failures
-        return await with_token_limit_retry(
-            _do_pipeline_processing,
-            token_client,
-            max_retries=3
-        )
+        return await run_pipeline(filename)
     except Exception as e:
-        # If retry logic fails, still return a proper result
-        logger.error(f"Pipeline processing failed after retries for {filename}: {str(e)}")
+        # Still return a proper result for unexpected errors
+        logger.error(f"Pipeline processing failed for {filename}: {str(e)}")
         return False, InternalWhisperResult(
-            text=f"Pipeline failed after retries: {str(e)}",
+            text=f"Pipeline failed: {str(e)}",
             diarization=False,
             processing_metadata=ProcessingMetadata(
                 filename=filename,
                 processing_time_seconds=0,
-                transcription_method="failed_with_retries",
+                transcription_method="failed_with_exception",
                 chunk_method="none"
             )
         )
 
 async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
     """
-    Main audio processing pipeline that orchestrates all steps:
+    Run the audio processing pipeline for a file once one of the
+    MAX_CONCURRENT_PIPELINES slots is free (see _run_pipeline).
+    
+    Args:
+        filename: Name of the audio file to process (blob name in Azure Storage)
+        
+    Returns:
+        Tuple[bool, InternalWhisperResult]: (success, result)
+    """
+    async with _get_pipeline_semaphore():
+        return await _run_pipeline(filename)
+
+async def _run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
+    """
+    Main audio processing pipeline that orchestrates all steps. CPU-bound steps run
+    in worker threads so concurrent pipelines keep the event loop responsive:
     
-    1. Download Audio File from Azure Blob Storage and verify stereo format (audio_downloader)
+    1. Download Audio File from Azure Blob Storage and verify stereo format (audio_downloader).
+       Mono files skip diarization (step 3) and are transcribed as a single speaker.
     2. Remove silence from audio where both channels are silent (audio_preprocessor)
     3. Perform diarization according to the energy of the channels and inertia (audio_diarizer)
     4. Preprocess the audio to 16kHz (if not already 16kHz) and convert to mono. Then convert to .flac. (audio_preprocessor)
+       Steps 3 and 4 run concurrently, as both only read the silence-trimmed audio.
     5. Chunk the audio into smaller chunks (audio_chunker)
     6. Parallel Whisper Transcription for mono audio chunks
     7. Apply diarization to the transcription (audio_postprocessor)
@@ -79,11 +130,39 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
     Returns:
         Tuple[bool, InternalWhisperResult]: (success, result)
     """
-    start_time = time.time()
+    start_time = time.monotonic()
     process = psutil.Process(os.getpid())
+
+    def _fail(text: str, transcription_method: str, **metadata) -> Tuple[bool, InternalWhisperResult]:
+        """
+        Log the failed run and build its result.
+        
+        Keyword arguments go to ProcessingMetadata, except diarization and
+        speaker_segments which go to InternalWhisperResult. The arguments are
+        already of the declared types, so the models are built without validation.
+        """
+        processing_time = time.monotonic() - start_time
+        end_mem_mb = process.memory_info().rss / (1024 * 1024)
+        logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
+        diarization = metadata.pop("diarization", False)
+        speaker_segments = metadata.pop("speaker_segments", [])
+        metadata.setdefault("chunk_method", "none")
+        return False, InternalWhisperResult.model_construct(
+            text=text,
+            diarization=diarization,
+            speaker_segments=speaker_segments,
+            processing_metadata=ProcessingMetadata.model_construct(
+                filename=filename,
+                processing_time_seconds=processing_time,
+                transcription_method=transcription_method,
+                **metadata
+            )
+        )
+
     downloader = None
     preprocessor = None
     chunker = None
+    diarizer, transcriber, post_processor = _get_shared_stages()
     try:
         start_mem_mb = process.memory_info().rss / (1024 * 1024)
         # 1. Download Audio File and verify stereo
@@ -93,168 +172,131 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
 
         if not success:
             logger.error(f"Failed to download audio file {filename}: {error_msg}")
-            processing_time = time.time() - start_time
-            end_mem_mb = process.memory_info().rss / (1024 * 1024)
-            logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
-            return False, InternalWhisperResult(
-                text=f"Failed to download audio file: {error_msg}",
-                diarization=False,
-                processing_metadata=ProcessingMetadata(
-                    filename=filename,
-                    processing_time_seconds=processing_time,
-                    transcription_method="failed_download",
-                    chunk_method="none"
-                )
+            return _fail(
+                f"Failed to download audio file: {error_msg}",
+                "failed_download"
             )
         
         logger.info(f"Successfully downloaded {filename} to {local_file_path}")
 
         is_stereo, audio_info = downloader.verify_stereo_format(local_file_path)
-        if not is_stereo:
-            logger.error(f"Audio file {filename} is not in stereo format, which is required for this pipeline.")
-            processing_time = time.time() - start_time
-            end_mem_mb = process.memory_info().rss / (1024 * 1024)
-            logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
-            return False, InternalWhisperResult(
-                text="Audio file is not stereo.",
-                diarization=False,
-                processing_metadata=ProcessingMetadata(
-                    filename=filename,
-                    processing_time_seconds=processing_time,
-                    transcription_method="failed_preprocess",
-                    chunk_method="none",
-                    original_audio_info=audio_info
-                )
+        # Mono files have a single speaker channel: they skip diarization and are
+        # transcribed once as a single speaker
+        diarized = is_stereo
+        if not is_stereo and audio_info.get('channels') != 1:
+            logger.error(f"Audio file {filename} is neither stereo nor mono, which is required for this pipeline.")
+            return _fail(
+                "Audio file is not stereo.",
+                "failed_preprocess",
+                original_audio_info=audio_info
             )
 
         # 2. Remove silence from audio where both channels are silent
         logger.info("Starting silence removal step.")
         preprocessor = AudioPreprocessor()
-        success, silence_trimmed_path, error_msg = preprocessor.remove_silence_from_stereo(local_file_path)
+        success, trimmed_audio, error_msg = await asyncio.to_thread(preprocessor.remove_silence_from_stereo, local_file_path)
 
-        if not success:
+        if not success or trimmed_audio is None:
             logger.error(f"Failed to remove silence from {filename}: {error_msg}")
-            processing_time = time.time() - start_time
-            end_mem_mb = process.memory_info().rss / (1024 * 1024)
-            logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
-            return False, InternalWhisperResult(
-                text=f"Failed during silence removal: {error_msg}",
-                diarization=False,
-                processing_metadata=ProcessingMetadata(
-                    filename=filename,
-                    processing_time_seconds=processing_time,
-                    transcription_method="failed_preprocess",
-                    chunk_method="none",
-                    original_audio_info=audio_info
-                )
+            return _fail(
+                f"Failed during silence removal: {error_msg}",
+                "failed_preprocess",
+                original_audio_info=audio_info
             )
         
-        logger.info(f"Successfully removed silence. New audio at: {silence_trimmed_path}")
+        logger.info("Successfully removed silence.")
 
-        # 3. Perform diarization according to the energy of the channels and inertia
-        logger.info("Starting diarization step.")
-        diarizer = AudioDiarizer()
-        success, speaker_segments, error_msg = diarizer.diarize(silence_trimmed_path)
+        # 3. Perform diarization according to the energy of the channels and inertia, and
+        # 4. preprocess the audio to 16kHz mono FLAC. Both only read the trimmed audio,
+        # so they run concurrently in worker threads.
+        if diarized:
+            logger.info("Starting diarization step and mono conversion, resampling, and FLAC encoding.")
+            (success, speaker_segments, error_msg), mono_result = await asyncio.gather(
+                asyncio.to_thread(diarizer.diarize, local_file_path, trimmed_audio),
+                asyncio.to_thread(preprocessor.process_to_mono_flac, local_file_path, audio=trimmed_audio)
+            )
 
-        if not success:
-            logger.error(f"Failed to diarize {filename}: {error_msg}")
-            processing_time = time.time() - start_time
-            end_mem_mb = process.memory_info().rss / (1024 * 1024)
-            logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
-            return False, InternalWhisperResult(
-                text=f"Failed during diarization: {error_msg}",
-                diarization=False,
-                processing_metadata=ProcessingMetadata(
-                    filename=filename,
-                    processing_time_seconds=processing_time,
-                    transcription_method="failed_diarization",
-                    chunk_method="none",
+            if not success:
+                logger.error(f"Failed to diarize {filename}: {error_msg}")
+                return _fail(
+                    f"Failed during diarization: {error_msg}",
+                    "failed_diarization",
                     original_audio_info=audio_info
                 )
-            )
-        
-        logger.info(f"Successfully diarized audio. Found {len(speaker_segments)} segments.")
+            
+            logger.info(f"Successfully diarized audio. Found {len(speaker_segments)} segments.")
+        else:
+            logger.info("Mono input: skipping diarization. Starting resampling and FLAC encoding.")
+            speaker_segments = []
+            mono_result = await asyncio.to_thread(preprocessor.process_to_mono_flac, local_file_path, audio=trimmed_audio)
 
-        # 4. Preprocess the audio to 16kHz mono FLAC
-        logger.info("Starting mono conversion, resampling, and FLAC encoding.")
-        success, mono_flac_path, error_msg, preprocessed_audio_info = preprocessor.process_to_mono_flac(silence_trimmed_path)
+        success, mono_flac_path, error_msg, preprocessed_audio_info = mono_result
+        # Both stages are done with the decoded audio; do not hold it through transcription
+        trimmed_audio = None
 
         if not success:
             logger.error(f"Failed to preprocess audio for {filename}: {error_msg}")
-            processing_time = time.time() - start_time
-            end_mem_mb = process.memory_info().rss / (1024 * 1024)
-            logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
-            return False, InternalWhisperResult(
-                text=f"Failed during preprocessing (mono/flac): {error_msg}",
-                diarization=True,
+            return _fail(
+                f"Failed during preprocessing (mono/flac): {error_msg}",
+                "failed_preprocess",
+                diarization=diarized,
                 speaker_segments=speaker_segments,
-                processing_metadata=ProcessingMetadata(
-                    filename=filename,
-                    processing_time_seconds=processing_time,
-                    transcription_method="failed_preprocess",
-                    chunk_method="none",
-                    original_audio_info=audio_info,
-                    has_speaker_alignment=True
-                )
+                original_audio_info=audio_info,
+                has_speaker_alignment=diarized
             )
 
         logger.info(f"Successfully preprocessed audio to mono FLAC: {mono_flac_path}")
 
-        # 5. Chunk the audio into smaller chunks
-        logger.info("Starting audio chunking step.")
+        # 5. Chunk the audio into smaller chunks and 6. transcribe them in parallel.
+        # Each chunk is sent to Whisper as soon as it is written, so chunking overlaps
+        # with the uploads already in flight.
+        logger.info("Starting audio chunking and parallel Whisper transcription step.")
         chunker = AudioChunker()
-        audio_chunks = chunker.chunk_audio(mono_flac_path, preprocessed_audio_info)
+        transcribed_chunks = await transcriber.transcribe_chunk_stream(
+            chunker.iter_chunks(mono_flac_path, preprocessed_audio_info, preprocessor.pop_mono_audio(mono_flac_path)),
+            language=None
+        )
+        audio_chunks = [tc.chunk for tc in transcribed_chunks]
 
         if not audio_chunks:
             logger.error(f"Audio chunking failed for {filename}. No chunks were produced.")
-            processing_time = time.time() - start_time
-            end_mem_mb = process.memory_info().rss / (1024 * 1024)
-            logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
             # This is a critical failure, but let's create a specific error message
-            return False, InternalWhisperResult(
-                text="Failed during audio chunking: no chunks created.",
-                diarization=True,
+            return _fail(
+                "Failed during audio chunking: no chunks created.",
+                "failed_chunking",
+                diarization=diarized,
                 speaker_segments=speaker_segments,
-                processing_metadata=ProcessingMetadata(
-                    filename=filename,
-                    processing_time_seconds=processing_time,
-                    transcription_method="failed_chunking",
-                    chunk_method="size_based",
-                    original_audio_info=audio_info,
-                    preprocessed_audio_info=preprocessed_audio_info,
-                    has_speaker_alignment=True
-                )
+                chunk_method="size_based",
+                original_audio_info=audio_info,
+                preprocessed_audio_info=preprocessed_audio_info,
+                has_speaker_alignment=diarized
             )
             
         chunk_method = "size_based" if len(audio_chunks) > 1 else "direct"
         logger.info(f"Audio chunking complete. Created {len(audio_chunks)} chunk(s) using '{chunk_method}' method.")
 
-        # 6. Parallel Whisper Transcription for mono audio chunks
-        logger.info("Starting parallel Whisper transcription step.")
-        transcriber = WhisperTranscriber()
-        transcribed_chunks = await transcriber.transcribe_chunks(audio_chunks, language=None)
+        # Split failures from usable results in a single pass over the chunks
+        failed_chunks = []
+        successful_chunks = []
+        for tc in transcribed_chunks:
+            if tc.error:
+                failed_chunks.append(tc)
+            elif tc.transcription_result:
+                successful_chunks.append(tc)
 
-        failed_chunks = [tc for tc in transcribed_chunks if tc.error]
         if len(failed_chunks) == len(audio_chunks):
             logger.error(f"All {len(audio_chunks)} transcription chunks failed for {filename}.")
-            processing_time = time.time() - start_time
-            end_mem_mb = process.memory_info().rss / (1024 * 1024)
-            logger.error(f"Pipeline failed for {filename}. Duration: {processing_time:.2f}s. Final memory: {end_mem_mb:.2f} MB.")
             first_error = failed_chunks[0].error if failed_chunks else "Unknown transcription failure."
-            return False, InternalWhisperResult(
-                text=f"Transcription failed for all chunks: {first_error}",
-                diarization=True,
+            return _fail(
+                f"Transcription failed for all chunks: {first_error}",
+                "failed_transcription",
+                diarization=diarized,
                 speaker_segments=speaker_segments,
-                processing_metadata=ProcessingMetadata(
-                    filename=filename,
-                    processing_time_seconds=processing_time,
-                    transcription_method="failed_transcription",
-                    chunk_method=chunk_method,
-                    total_chunks=len(audio_chunks),
-                    original_audio_info=audio_info,
-                    preprocessed_audio_info=preprocessed_audio_info,
-                    has_speaker_alignment=True
-                )
+                chunk_method=chunk_method,
+                total_chunks=len(audio_chunks),
+                original_audio_info=audio_info,
+                preprocessed_audio_info=preprocessed_audio_info,
+                has_speaker_alignment=diarized
             )
 
         if failed_chunks:
@@ -262,44 +304,40 @@ async def run_pipeline(filename: str) -> Tuple[bool, InternalWhisperResult]:
 
         logger.info("Successfully transcribed audio chunks.")
 
-        # 7. Apply diarization to the transcription and assemble final transcript
+        # 7. Apply diarization to the transcription and assemble final transcript. Mono
+        # input is aligned against one segment spanning the whole file.
         logger.info("Starting post-processing to assemble final transcript.")
-        post_processor = TranscriptionPostProcessor()
-        # Filter out chunks that failed to transcribe before passing to post-processor
-        successful_chunks = [tc for tc in transcribed_chunks if tc.transcription_result]
-        final_transcript = post_processor.assemble_transcript(successful_chunks, speaker_segments)
+        alignment_segments = speaker_segments if diarized else [
+            SpeakerSegment(start_time=0.0, end_time=preprocessed_audio_info['duration'], speaker_id="Speaker_1")
+        ]
+        final_transcript = await asyncio.to_thread(post_processor.assemble_transcript, successful_chunks, alignment_segments)
 
         if not final_transcript:
             logger.warning(f"Post-processing for {filename} resulted in an empty transcript.")
 
-        processing_time = time.time() - start_time
+        processing_time = time.monotonic() - start_time
         end_mem_mb = process.memory_info().rss / (1024 * 1024)
         mem_used_mb = end_mem_mb - start_mem_mb
         logger.info(f"Pipeline completed for {filename} in {processing_time:.2f} seconds. Memory used: {mem_used_mb:.2f} MB (End: {end_mem_mb:.2f} MB).")
 
     finally:
-        if downloader:
-            downloader.cleanup()
-            logger.info("Temporary download directory cleaned up.")
-        if preprocessor:
-            preprocessor.cleanup()
-            logger.info("Temporary preprocessor directory cleaned up.")
-        if chunker:
-            chunker.cleanup()
-            logger.info("Temporary chunker directory cleaned up.")
+        # Remove the temporary directories concurrently and off the event loop
+        stages = [stage for stage in (downloader, preprocessor, chunker) if stage]
+        await asyncio.gather(*(asyncio.to_thread(stage.cleanup) for stage in stages), return_exceptions=True)
+        logger.info("Temporary download, preprocessor and chunker directories cleaned up.")
     
     return True, InternalWhisperResult(
         text=final_transcript,
-        diarization=True,
+        diarization=diarized,
         speaker_segments=speaker_segments, # Return original diarization for metadata
         processing_metadata=ProcessingMetadata(
             filename=filename,
             processing_time_seconds=processing_time,
-            transcription_method="mono",
+            transcription_method="mono" if diarized else "whisper_mono",
             chunk_method=chunk_method,
             total_chunks=len(audio_chunks),
             original_audio_info=audio_info,
             preprocessed_audio_info=preprocessed_audio_info,
-            has_speaker_alignment=True
+            has_speaker_alignment=diarized
         )
     )
\ No newline at end of file
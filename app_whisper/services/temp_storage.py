@@ -0,0 +1,27 @@
+"""
+Temp storage location shared by the audio pipeline stages.
+Stages intermediate audio on the /dev/shm RAM disk while it has room.
+"""
+import os
+import shutil
+from typing import Optional
+
+# Temp files are staged on /dev/shm while it has at least this much free space
+TMPFS_MIN_FREE_MB = int(os.getenv("WHISPER_TMPFS_MIN_FREE_MB", "1024"))
+
+def get_temp_parent() -> Optional[str]:
+    """
+    Return /dev/shm if it is writable and has at least TMPFS_MIN_FREE_MB free.
+    
+    Checked on every call, so new temp directories go back to disk once the
+    RAM disk fills up with other files' audio.
+    
+    Returns:
+        Optional[str]: Parent directory for tempfile.mkdtemp, or None for the default
+    """
+    try:
+        if os.access("/dev/shm", os.W_OK) and shutil.disk_usage("/dev/shm").free >= TMPFS_MIN_FREE_MB * 1024 * 1024:
+            return "/dev/shm"
+    except OSError:
+        pass
+    return None
@@ -2,12 +2,16 @@
 Azure OpenAI Service for making API calls to Azure-hosted OpenAI models.
 """
 import os
+import asyncio
+import httpx
 import tiktoken
 import instructor
 from typing import Dict, List, Any, Optional, TypeVar, Type
 
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from openai import AzureOpenAI
+from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+from azure.identity.aio import get_bearer_token_provider as get_async_bearer_token_provider
+from openai import AzureOpenAI, AsyncAzureOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 from pydantic import BaseModel, ValidationError
 from common_new.logger import get_logger
@@ -20,6 +24,12 @@ logger = get_logger("common")
 
 COUNTER_BASE_URL = os.getenv("APP_COUNTER_APP_BASE_URL")
 
+# Idle keep-alive connections to the Whisper endpoint are kept this long, so warmed
+# connections survive until the first chunk upload
+AUDIO_KEEPALIVE_SECONDS = float(os.getenv("APP_OPENAI_AUDIO_KEEPALIVE_SECONDS", "30"))
+# Default size of the Whisper connection pool; transcribers pass their own concurrency limit
+AUDIO_MAX_CONNECTIONS = int(os.getenv("APP_OPENAI_AUDIO_MAX_CONNECTIONS", "8"))
+
 # Type variable for Pydantic models
 T = TypeVar('T', bound=BaseModel)
 
@@ -345,7 +355,8 @@ class AzureOpenAIServiceWhisper(AzureOpenAIService):
     Service for interacting with Azure-hosted OpenAI Whisper models.
     Provides functionality for audio transcription with centralized rate limiting and error handling.
     """
-    def __init__(self, model: Optional[str] = None, app_id: str = "default_app", token_counter_url: str = COUNTER_BASE_URL):
+    def __init__(self, model: Optional[str] = None, app_id: str = "default_app", token_counter_url: str = COUNTER_BASE_URL,
+                 max_connections: int = AUDIO_MAX_CONNECTIONS):
         super().__init__(model=model, app_id=app_id, token_counter_url=token_counter_url)
         
         self.api_version = os.getenv("APP_OPENAI_API_VERSION")
@@ -358,24 +369,63 @@ class AzureOpenAIServiceWhisper(AzureOpenAIService):
         
         # Initialize a separate client for audio operations
         self._audio_client = None
+        self._audio_http_client = None
+        # Transcriptions in flight never exceed this, so the pool needs no more connections
+        self._audio_max_connections = max_connections
         
-    def _initialize_audio_client(self) -> AzureOpenAI:
+    def _initialize_audio_client(self) -> AsyncAzureOpenAI:
         """
-        Initialize the Azure OpenAI client specifically for audio operations.
+        Initialize the async Azure OpenAI client specifically for audio operations.
+        
+        The client is created once per service and keeps a pool of keep-alive
+        connections, so concurrent transcriptions reuse TLS connections and
+        uploads do not block the event loop. Tokens come from the async credential,
+        so refreshing one does not block the event loop either.
         """
         if self._audio_client is None:
-            token_provider = get_bearer_token_provider(
-                DefaultAzureCredential(), 
-                "https://cognitiveservices.azure.com/.default"
+            self._audio_http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self._audio_max_connections,
+                    max_keepalive_connections=self._audio_max_connections,
+                    keepalive_expiry=AUDIO_KEEPALIVE_SECONDS,
+                )
             )
-            
-            self._audio_client = AzureOpenAI(
+            self._audio_client = AsyncAzureOpenAI(
                 api_version=self.api_version,
                 azure_endpoint=self.azure_endpoint,
-                azure_ad_token_provider=token_provider,
+                azure_ad_token_provider=get_async_bearer_token_provider(
+                    AsyncDefaultAzureCredential(),
+                    "https://cognitiveservices.azure.com/.default"
+                ),
+                http_client=self._audio_http_client,
             )
             
         return self._audio_client
+
+    async def warmup(self, connections: int = 1) -> None:
+        """
+        Pre-open keep-alive connections to the Whisper endpoint.
+        
+        Sends concurrent HEAD requests to the endpoint base URL so the TCP and TLS
+        handshakes are paid before the first chunk is uploaded. Responses and errors
+        are ignored, since a failed warmup only means the first upload connects itself.
+        
+        Args:
+            connections: Number of connections to open
+        """
+        self._initialize_audio_client()
+        if self._audio_http_client is None or connections < 1:
+            return
+        
+        results = await asyncio.gather(
+            *(self._audio_http_client.head(self.azure_endpoint) for _ in range(connections)),
+            return_exceptions=True
+        )
+        failures = sum(1 for result in results if isinstance(result, BaseException))
+        if failures:
+            logger.warning(f"Whisper connection warmup: {failures} of {connections} requests failed")
+        else:
+            logger.info(f"Warmed up {connections} connection(s) to the Whisper endpoint")
     
     async def _transcribe_audio_internal(
         self,
@@ -439,7 +489,7 @@ class AzureOpenAIServiceWhisper(AzureOpenAIService):
             with open(audio_file_path, "rb") as audio_file:
                 logger.debug(f"Sending transcription request with params: {transcription_params}")
                 
-                response = client.audio.transcriptions.create(
+                response = await client.audio.transcriptions.create(
                     file=audio_file,
                     **transcription_params
                 )
@@ -457,6 +507,10 @@ class AzureOpenAIServiceWhisper(AzureOpenAIService):
             logger.info(f"Successfully transcribed audio file: {audio_file_path}")
             return result
             
+        except asyncio.CancelledError:
+            # Release the rate slot if a caller deadline cancels the request
+            await self.token_client.release_whisper_rate(request_id)
+            raise
         except Exception as e:
             # Release the rate slot if transcription fails
             await self.token_client.release_whisper_rate(request_id)
@@ -3,13 +3,17 @@ Asynchronous Azure Blob Storage client for uploading and downloading files.
 """
 import os
 import asyncio
-from typing import Optional, Set, List
+import random
+from typing import Optional, Set, List, Tuple
 from azure.storage.blob.aio import BlobClient, ContainerClient
 from azure.identity.aio import DefaultAzureCredential
 from common_new.logger import get_logger
 
 logger = get_logger("common")
 
+# Blobs at least this large are downloaded as parallel range requests
+PARALLEL_DOWNLOAD_MIN_BYTES = 8 * 1024 * 1024
+
 class AsyncBlobStorageUploader:
     """
     Asynchronous handler for uploading files to Azure Blob Storage.
@@ -301,7 +305,8 @@ class AsyncBlobStorageDownloader:
         container_name: str,
         max_retries: int = 5,
         retry_delay: float = 2.0,
-        download_dir: Optional[str] = None
+        download_dir: Optional[str] = None,
+        max_concurrency: int = 8
     ):
         """
         Initialize the Azure Blob Storage downloader.
@@ -312,12 +317,14 @@ class AsyncBlobStorageDownloader:
             max_retries: Maximum number of retry attempts for failed downloads
             retry_delay: Base delay between retries in seconds (uses exponential backoff)
             download_dir: Directory to download files to (defaults to current directory)
+            max_concurrency: Parallel range requests per download for large blobs
         """
         self.account_url = account_url
         self.container_name = container_name
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.download_dir = download_dir or os.getcwd()
+        self.max_concurrency = max_concurrency
         self._initialized = False
         
         # Ensure download directory exists
@@ -413,8 +420,9 @@ class AsyncBlobStorageDownloader:
                 return local_file_path
             
             if attempt < self.max_retries - 1:
-                wait_time = self.retry_delay * (2 ** attempt)
-                logger.warning(f"Download attempt {attempt + 1} failed, retrying in {wait_time} seconds")
+                # Jitter the backoff so concurrent downloads do not retry in lockstep
+                wait_time = self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"Download attempt {attempt + 1} failed, retrying in {wait_time:.1f} seconds")
                 await asyncio.sleep(wait_time)
         
         logger.error(f"Failed to download {blob_name} after {self.max_retries} attempts")
@@ -456,11 +464,11 @@ class AsyncBlobStorageDownloader:
             
             logger.info(f"Downloading {blob_name} ({blob_size} bytes) to {local_file_path}")
             
-            # Download the blob
+            # Download the blob, small blobs in one request and larger ones as parallel range requests
+            max_concurrency = self.max_concurrency if blob_size >= PARALLEL_DOWNLOAD_MIN_BYTES else 1
             with open(local_file_path, "wb") as download_file:
-                download_stream = await blob_client.download_blob()
-                async for chunk in download_stream.chunks():
-                    download_file.write(chunk)
+                download_stream = await blob_client.download_blob(max_concurrency=max_concurrency)
+                await download_stream.readinto(download_file)
             
             # Verify the download
             if os.path.exists(local_file_path):
@@ -577,3 +585,45 @@ class AsyncBlobStorageDownloader:
             if credential:
                 await credential.close()
 
+    
+    async def read_blob_head(self, blob_name: str, length: int = 65536) -> Optional[Tuple[bytes, int]]:
+        """
+        Read the first bytes of a blob without downloading the rest of it.
+        
+        Args:
+            blob_name: Name of the blob to read
+            length: Maximum number of bytes to read from the start of the blob
+            
+        Returns:
+            Tuple[bytes, int]: (first bytes of the blob, total blob size), or None if reading failed
+        """
+        if not self._initialized:
+            success = await self.initialize()
+            if not success:
+                return None
+        
+        credential = None
+        blob_client = None
+        
+        try:
+            credential = DefaultAzureCredential()
+            blob_client = BlobClient(
+                account_url=self.account_url,
+                container_name=self.container_name,
+                blob_name=blob_name,
+                credential=credential
+            )
+            
+            # One ranged GET; its properties still report the size of the whole blob
+            download_stream = await blob_client.download_blob(offset=0, length=length)
+            head = await download_stream.readall()
+            return head, download_stream.properties.size
+            
+        except Exception as e:
+            logger.error(f"Error reading head of blob {blob_name}: {str(e)}")
+            return None
+        finally:
+            if blob_client:
+                await blob_client.close()
+            if credential:
+                await credential.close()
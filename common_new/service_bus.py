@@ -23,7 +23,8 @@ class AsyncServiceBusHandler:
         max_retries: int = 5,
         retry_delay: float = 3.0,
         max_wait_time: float = 3.0,
-        message_batch_size: int = 1
+        message_batch_size: int = 1,
+        concurrent_processing: bool = False
     ):
         self.fully_qualified_namespace = fully_qualified_namespace
         self.in_queue_name = in_queue_name
@@ -33,6 +34,8 @@ class AsyncServiceBusHandler:
         self.retry_delay = retry_delay
         self.max_wait_time = max_wait_time
         self.message_batch_size = message_batch_size
+        # Process all messages of a received batch concurrently instead of one by one
+        self.concurrent_processing = concurrent_processing
         self.running = False
         
         # Service Bus resources - initialized for each operation
@@ -123,6 +126,24 @@ class AsyncServiceBusHandler:
             logger.error(f"Error sending message: {str(e)}")
             return False
 
+    async def _complete_and_process(self, receiver, msg) -> bool:
+        """Complete a received message, then process it. Returns True if it was processed."""
+        try:
+            # First complete the message to prevent reprocessing
+            try:
+                await receiver.complete_message(msg)
+                logger.debug(f"Marked message as complete")
+            except Exception as complete_err:
+                logger.warning(f"Failed to complete message: {str(complete_err)}")
+            
+            # Then process the message
+            await self.process_message(msg)
+            return True
+        except Exception as e:
+            logger.error(f"Error in message processing loop: {str(e)}")
+            # Continue with next message
+            return False
+
     async def listen(self) -> None:
         """
         Start listening for messages using fresh connections for each cycle
@@ -169,21 +190,13 @@ class AsyncServiceBusHandler:
                                 logger.info(f"Received {len(received_msgs)} messages")
                                 
                                 # Process each message, individually handle errors
-                                for msg in received_msgs:
-                                    try:
-                                        # First complete the message to prevent reprocessing
-                                        try:
-                                            await receiver.complete_message(msg)
-                                            logger.debug(f"Marked message as complete")
-                                        except Exception as complete_err:
-                                            logger.warning(f"Failed to complete message: {str(complete_err)}")
-                                        
-                                        # Then process the message
-                                        await self.process_message(msg)
-                                        processed_messages += 1
-                                    except Exception as e:
-                                        logger.error(f"Error in message processing loop: {str(e)}")
-                                        # Continue with next message
+                                if self.concurrent_processing:
+                                    results = await asyncio.gather(
+                                        *[self._complete_and_process(receiver, msg) for msg in received_msgs]
+                                    )
+                                else:
+                                    results = [await self._complete_and_process(receiver, msg) for msg in received_msgs]
+                                processed_messages += sum(results)
                 finally:
                     # Ensure resources are cleaned up even if context managers fail
                     if servicebus_client:
@@ -594,7 +594,7 @@ class TestAzureOpenAIServiceWhisper:
         mock_audio_client = MagicMock()
         mock_transcription = MagicMock()
         mock_transcription.model_dump.return_value = {"text": "Hello world"}
-        mock_audio_client.audio.transcriptions.create.return_value = mock_transcription
+        mock_audio_client.audio.transcriptions.create = AsyncMock(return_value=mock_transcription)
         
         with patch.object(whisper_service, '_initialize_audio_client', return_value=mock_audio_client):
             result = await whisper_service._transcribe_audio_internal("dummy.mp3")
@@ -627,7 +627,7 @@ class TestAzureOpenAIServiceWhisper:
         whisper_service.token_client = mock_token_client
 
         mock_audio_client = MagicMock()
-        mock_audio_client.audio.transcriptions.create.side_effect = Exception("API Error")
+        mock_audio_client.audio.transcriptions.create = AsyncMock(side_effect=Exception("API Error"))
 
         with patch.object(whisper_service, '_initialize_audio_client', return_value=mock_audio_client):
             with pytest.raises(Exception, match="API Error"):
@@ -636,6 +636,23 @@ class TestAzureOpenAIServiceWhisper:
             mock_token_client.lock_whisper_rate.assert_called_once()
             mock_token_client.release_whisper_rate.assert_called_once_with("req_whisper_err")
 
+    @pytest.mark.asyncio
+    @patch("builtins.open", new_callable=MagicMock)
+    async def test_transcribe_audio_internal_cancelled_releases_slot(self, mock_open, whisper_service):
+        """Test internal transcription releases the rate slot when the request is cancelled."""
+        mock_token_client = AsyncMock()
+        mock_token_client.lock_whisper_rate.return_value = (True, "req_whisper_cancel", "")
+        whisper_service.token_client = mock_token_client
+
+        mock_audio_client = MagicMock()
+        mock_audio_client.audio.transcriptions.create = AsyncMock(side_effect=asyncio.CancelledError())
+
+        with patch.object(whisper_service, '_initialize_audio_client', return_value=mock_audio_client):
+            with pytest.raises(asyncio.CancelledError):
+                await whisper_service._transcribe_audio_internal("dummy.mp3")
+
+            mock_token_client.release_whisper_rate.assert_called_once_with("req_whisper_cancel")
+
     @pytest.mark.asyncio
     async def test_transcribe_audio_with_retry(self, whisper_service):
         """Test the backward compatibility of transcribe_audio_with_retry."""
@@ -645,13 +662,43 @@ class TestAzureOpenAIServiceWhisper:
             
     def test_initialize_audio_client_once(self, whisper_service):
         """Test that the audio client is only initialized once."""
-        with patch('common_new.azure_openai_service.AzureOpenAI') as mock_azure_openai:
+        with patch('common_new.azure_openai_service.AsyncAzureOpenAI') as mock_azure_openai:
             client1 = whisper_service._initialize_audio_client()
             client2 = whisper_service._initialize_audio_client()
             
             assert client1 is client2
             mock_azure_openai.assert_called_once()
 
+    def test_initialize_audio_client_pool_and_async_token_provider(self, whisper_service):
+        """Test that the audio client pool is sized from max_connections and uses the async credential."""
+        whisper_service._audio_max_connections = 4
+        with patch('common_new.azure_openai_service.AsyncAzureOpenAI') as mock_azure_openai, \
+             patch('common_new.azure_openai_service.DefaultAsyncHttpxClient') as mock_http_client, \
+             patch('common_new.azure_openai_service.AsyncDefaultAzureCredential') as mock_credential, \
+             patch('common_new.azure_openai_service.get_async_bearer_token_provider') as mock_provider:
+            whisper_service._initialize_audio_client()
+
+            limits = mock_http_client.call_args.kwargs['limits']
+            assert limits.max_connections == 4
+            assert limits.max_keepalive_connections == 4
+            mock_provider.assert_called_once_with(
+                mock_credential.return_value, "https://cognitiveservices.azure.com/.default"
+            )
+            assert mock_azure_openai.call_args.kwargs['azure_ad_token_provider'] is mock_provider.return_value
+
+    @pytest.mark.asyncio
+    async def test_warmup_opens_requested_connections(self, whisper_service):
+        """Test that warmup sends one HEAD request per connection and ignores failures."""
+        mock_http_client = MagicMock()
+        mock_http_client.head = AsyncMock(side_effect=[MagicMock(), Exception("connect failed"), MagicMock()])
+        whisper_service._audio_client = MagicMock()
+        whisper_service._audio_http_client = mock_http_client
+        
+        await whisper_service.warmup(3)
+        
+        assert mock_http_client.head.call_count == 3
+        mock_http_client.head.assert_called_with(whisper_service.azure_endpoint)
+
     @pytest.mark.asyncio
     async def test_transcribe_audio_chunks_success(self, whisper_service):
         """Test concurrent transcription of multiple audio chunks."""
@@ -709,7 +756,7 @@ class TestAzureOpenAIServiceWhisper:
 
         mock_audio_client = MagicMock()
         # For non-json formats, the response is a simple string, not a model object
-        mock_audio_client.audio.transcriptions.create.return_value = "Hello world"
+        mock_audio_client.audio.transcriptions.create = AsyncMock(return_value="Hello world")
         
         with patch.object(whisper_service, '_initialize_audio_client', return_value=mock_audio_client):
             result = await whisper_service._transcribe_audio_internal("dummy.mp3", response_format="text")
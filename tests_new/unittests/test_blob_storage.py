@@ -6,7 +6,7 @@ import asyncio
 import os
 import tempfile
 from unittest.mock import AsyncMock, Mock, patch, mock_open
-from common_new.blob_storage import AsyncBlobStorageUploader, AsyncBlobStorageDownloader
+from common_new.blob_storage import AsyncBlobStorageUploader, AsyncBlobStorageDownloader, PARALLEL_DOWNLOAD_MIN_BYTES
 
 
 class MockAsyncIterator:
@@ -1927,6 +1927,7 @@ class TestAsyncBlobStorageDownloader:
         assert downloader.max_retries == 5
         assert downloader.retry_delay == 2.0
         assert downloader.download_dir == os.getcwd()
+        assert downloader.max_concurrency == 8
         assert not downloader._initialized
     
     @pytest.mark.unit
@@ -1937,7 +1938,8 @@ class TestAsyncBlobStorageDownloader:
             container_name="custom-container",
             max_retries=3,
             retry_delay=1.0,
-            download_dir="/tmp/downloads"
+            download_dir="/tmp/downloads",
+            max_concurrency=4
         )
         
         assert downloader.account_url == "https://custom.blob.core.windows.net"
@@ -1945,6 +1947,7 @@ class TestAsyncBlobStorageDownloader:
         assert downloader.max_retries == 3
         assert downloader.retry_delay == 1.0
         assert downloader.download_dir == "/tmp/downloads"
+        assert downloader.max_concurrency == 4
     
     @pytest.mark.unit
     @patch('os.makedirs')
@@ -2073,6 +2076,67 @@ class TestAsyncBlobStorageDownloader:
                 assert result is True
                 mock_blob_client.close.assert_called_once()
                 mock_credential.close.assert_called_once()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_read_blob_head_requests_only_the_range(self):
+        """Test read_blob_head downloads only the first bytes and reports the blob size."""
+        downloader = AsyncBlobStorageDownloader(
+            account_url="https://test.blob.core.windows.net",
+            container_name="test-container"
+        )
+        downloader._initialized = True
+        
+        mock_credential = AsyncMock()
+        mock_blob_client = AsyncMock()
+        mock_stream = AsyncMock()
+        mock_stream.readall.return_value = b"RIFF"
+        mock_stream.properties = Mock(size=1000000)
+        mock_blob_client.download_blob.return_value = mock_stream
+        
+        with patch('common_new.blob_storage.DefaultAzureCredential', return_value=mock_credential):
+            with patch('common_new.blob_storage.BlobClient', return_value=mock_blob_client):
+                result = await downloader.read_blob_head("test.wav", length=1024)
+                
+                assert result == (b"RIFF", 1000000)
+                mock_blob_client.download_blob.assert_called_once_with(offset=0, length=1024)
+                mock_blob_client.get_blob_properties.assert_not_called()
+                mock_blob_client.close.assert_called_once()
+                mock_credential.close.assert_called_once()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    @pytest.mark.parametrize("blob_size, expected_concurrency", [
+        (1024, 1),
+        (PARALLEL_DOWNLOAD_MIN_BYTES - 1, 1),
+        (PARALLEL_DOWNLOAD_MIN_BYTES, 8),
+    ])
+    async def test_download_file_parallel_only_above_threshold(self, blob_size, expected_concurrency):
+        """Test download_file streams small blobs in one request and larger ones with max_concurrency."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            downloader = AsyncBlobStorageDownloader(
+                account_url="https://test.blob.core.windows.net",
+                container_name="test-container",
+                download_dir=temp_dir
+            )
+            downloader._initialized = True
+            
+            mock_credential = AsyncMock()
+            mock_blob_client = AsyncMock()
+            mock_blob_client.exists.return_value = True
+            mock_blob_client.get_blob_properties.return_value = Mock(size=blob_size)
+            mock_stream = AsyncMock()
+            mock_stream.readinto.side_effect = lambda stream: stream.write(b"\0" * blob_size)
+            mock_blob_client.download_blob.return_value = mock_stream
+            
+            with patch('common_new.blob_storage.DefaultAzureCredential', return_value=mock_credential):
+                with patch('common_new.blob_storage.BlobClient', return_value=mock_blob_client):
+                    result = await downloader.download_file("audio.wav")
+                    
+                    assert result == os.path.join(temp_dir, "audio.wav")
+                    assert os.path.getsize(result) == blob_size
+                    mock_blob_client.download_blob.assert_called_once_with(max_concurrency=expected_concurrency)
+                    mock_stream.readinto.assert_awaited_once()
 
 
 class TestAsyncBlobStorageUploaderEdgeCases:
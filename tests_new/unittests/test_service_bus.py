@@ -30,6 +30,7 @@ class TestAsyncServiceBusHandlerInit:
         assert handler.retry_delay == 3.0
         assert handler.max_wait_time == 3.0
         assert handler.message_batch_size == 1
+        assert handler.concurrent_processing is False
         assert not handler.running
         assert handler.total_processed_messages == 0
         assert handler.sleep_seconds == 4
@@ -424,6 +425,75 @@ class TestAsyncServiceBusHandlerListen:
                     processor_func.assert_called_with("test content")
                     assert handler.total_processed_messages == 1
     
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_listen_processes_batch_concurrently(self):
+        """Test that a received batch is processed concurrently when enabled."""
+        in_flight = 0
+        max_in_flight = 0
+        
+        async def processor_func(body):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return None
+        
+        handler = AsyncServiceBusHandler(
+            processor_function=processor_func,
+            in_queue_name="input-queue",
+            out_queue_name="output-queue",
+            fully_qualified_namespace="test.servicebus.windows.net",
+            message_batch_size=2,
+            concurrent_processing=True
+        )
+        
+        mock_credential = AsyncMock()
+        mock_service_client = Mock()
+        mock_receiver = AsyncMock()
+        mock_service_client.get_queue_receiver.return_value = mock_receiver
+        
+        messages = []
+        for i in range(2):
+            mock_message = Mock()
+            mock_message.message_id = f"test-msg-{i}"
+            mock_message.body = f"content {i}".encode()
+            messages.append(mock_message)
+        
+        call_count = 0
+        async def side_effect(*args, **kwargs):
+            nonlocal call_count
+            call_count += 1
+            if call_count == 1:
+                return messages
+            else:
+                handler.running = False
+                return []
+        
+        mock_receiver.receive_messages.side_effect = side_effect
+        mock_receiver.complete_message.return_value = None
+        
+        mock_service_client.__aenter__ = AsyncMock(return_value=mock_service_client)
+        mock_service_client.__aexit__ = AsyncMock(return_value=None)
+        mock_receiver.__aenter__ = AsyncMock(return_value=mock_receiver)
+        mock_receiver.__aexit__ = AsyncMock(return_value=None)
+        mock_service_client.close = AsyncMock()
+        mock_credential.close = AsyncMock()
+        
+        real_sleep = asyncio.sleep
+        async def fast_sleep(delay, *args, **kwargs):
+            await real_sleep(0)
+        
+        with patch('common_new.service_bus.DefaultAzureCredential', return_value=mock_credential):
+            with patch('common_new.service_bus.ServiceBusClient', return_value=mock_service_client):
+                with patch('common_new.service_bus.asyncio.sleep', side_effect=fast_sleep):
+                    await handler.listen()
+        
+        assert mock_receiver.complete_message.call_count == 2
+        assert max_in_flight == 2
+        assert handler.total_processed_messages == 2
+    
     @pytest.mark.asyncio
     @pytest.mark.unit
     async def test_listen_no_messages(self):